@@ -1,15 +1,25 @@
 import os
 import sys
+import errno
 import time
 import json
 import logging
 import subprocess
 import signal
+import tempfile
 import psutil
 import asyncio
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Setup Logger
 logging.basicConfig(level=logging.INFO)
@@ -27,6 +37,8 @@ app.add_middleware(
 
 CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../config.json"))
 STATE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../state.json"))
+MSGPACK_STATE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../state.msgpack"))
+HEARTBEAT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../heartbeat.json"))
 LOG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../logs/bot.log"))
 
 # --- Bot Manager ---
@@ -130,8 +142,9 @@ class ConfigUpdate(BaseModel):
 def get_config():
     if os.path.exists(CONFIG_PATH):
         try:
-            with open(CONFIG_PATH, 'r') as f:
-                return json.load(f)
+            with open(CONFIG_PATH, 'rb') as f:
+                raw = f.read()
+            return orjson.loads(raw) if orjson else json.loads(raw)
         except:
             return {}
     return {}
@@ -139,8 +152,37 @@ def get_config():
 @app.post("/config")
 def update_config(data: ConfigUpdate):
     try:
-        with open(CONFIG_PATH, 'w') as f:
-            json.dump(data.config, f, indent=4)
+        if orjson:
+            payload = orjson.dumps(data.config, option=orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps(data.config, indent=4).encode()
+        # Write a sibling temp file and rename over the config, so a crash
+        # mid-write never leaves a truncated config for the bot to /reload
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(CONFIG_PATH), prefix='.config-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates the file 0600; keep the config's own permissions
+            try:
+                os.chmod(tmp_path, os.stat(CONFIG_PATH).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, CONFIG_PATH)
+        except OSError as e:
+            os.unlink(tmp_path)
+            if e.errno not in (errno.EBUSY, errno.EXDEV):
+                raise
+            # config.json is a single-file bind mount (docker-compose), which
+            # can't be renamed over; rewrite it in place instead
+            with open(CONFIG_PATH, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
         return {"status": "saved"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -198,7 +240,19 @@ async def websocket_dashboard(websocket: WebSocket):
             
             # 3. Application State (from state.json)
             app_state = {}
-            if os.path.exists(STATE_PATH):
+            if msgpack and os.path.exists(MSGPACK_STATE_PATH) and (
+                not os.path.exists(STATE_PATH)
+                or os.path.getmtime(MSGPACK_STATE_PATH) >= os.path.getmtime(STATE_PATH)
+            ):
+                # Bot configured with system.state_format = "msgpack"; the newer file
+                # wins so a switch back to JSON doesn't leave a stale snapshot served
+                try:
+                    with open(MSGPACK_STATE_PATH, 'rb') as f:
+                        app_state = msgpack.unpackb(f.read())
+                except Exception as e:
+                    logger.error(f"Error reading state.msgpack: {e}")
+                    app_state = {}
+            elif os.path.exists(STATE_PATH):
                 try:
                     with open(STATE_PATH, 'r') as f:
                         app_state = json.load(f)
@@ -209,6 +263,15 @@ async def websocket_dashboard(websocket: WebSocket):
                     logger.error(f"Error reading state.json: {e}")
                     app_state = {}
             
+            # The bot only rewrites state when it changes; the heartbeat file
+            # carries the latest updated_at/timestamp
+            if app_state:
+                try:
+                    with open(HEARTBEAT_PATH, 'rb') as f:
+                        app_state.update(json.loads(f.read()))
+                except (OSError, ValueError):
+                    pass
+            
             # Provide fallback values for missing fields
             default_bot_state = {
                 "status": "stopped",
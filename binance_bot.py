@@ -6,26 +6,35 @@ A simplified grid trading bot using the Binance Futures API.
 import os
 import sys
 import json
+import errno
 import time
 import signal
 import logging
 import argparse
 import threading
+import queue
 import select
-import sys
 import subprocess
+from collections import deque
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
+import numpy as np
 from dotenv import load_dotenv
 from colorama import init, Fore, Style
+# Fast JSON for state persistence when available
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Advanced Modules
 from src.telegram_bot import TelegramNotifier
 from src.scanner import MarketScanner
 from src.websocket_manager import WebSocketManager
 
-# Initialize colorama
-init()
+# Initialize colorama (ANSI translation is only needed on Windows consoles)
+if os.name == 'nt':
+    init()
 
 # Add src to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -48,18 +57,24 @@ def setup_logging(config):
             logging.INFO: f"{Fore.WHITE}%(asctime)s │ {Fore.GREEN}INFO{Fore.WHITE}    │ %(message)s{Style.RESET_ALL}",
             logging.WARNING: f"{Fore.YELLOW}%(asctime)s │ ⚠ WARN  │ %(message)s{Style.RESET_ALL}",
             logging.ERROR: f"{Fore.RED}%(asctime)s │ ✗ ERROR │ %(message)s{Style.RESET_ALL}",
-            logging.CRITICAL: f"{Fore.RED}{Style.BRIGHT}%(asctime)s │ ✗ CRIT  │ %(message)s{Style.RESET_ALL}",
+            logging.CRITICAL: f"\x1b[1;31m%(asctime)s │ ✗ CRIT  │ %(message)s{Style.RESET_ALL}",
         }
         
+        def __init__(self):
+            super().__init__()
+            # One Formatter per level, built once instead of per record
+            self._formatters = {level: logging.Formatter(fmt, datefmt='%H:%M:%S')
+                                for level, fmt in self.FORMATS.items()}
+        
         def format(self, record):
-            log_fmt = self.FORMATS.get(record.levelno, self.FORMATS[logging.INFO])
-            formatter = logging.Formatter(log_fmt, datefmt='%H:%M:%S')
-            return formatter.format(record)
+            return self._formatters.get(record.levelno, self._formatters[logging.INFO]).format(record)
 
-    # Filter out keepalive noise
+    # Filter out keepalive noise from library loggers. The bot's own records
+    # (root logger) pass without being formatted here; the handler's
+    # formatter is the only place they get rendered.
     class KeepAliveFilter(logging.Filter):
         def filter(self, record):
-            return "keepalive_socket" not in record.getMessage()
+            return record.name == 'root' or "keepalive_socket" not in record.getMessage()
 
     keep_alive_filter = KeepAliveFilter()
     
@@ -98,6 +113,35 @@ class BinanceGridBot:
         "AGGRESSIVE": {"grids": 8, "spacing_pct": 0.0005, "leverage": 5},
     }
     
+    # Keep last 20 prices (about 3-4 minutes at 10s intervals)
+    PRICE_HISTORY_LEN = 20
+    
+    # Binance batch endpoint accepts at most 5 orders per call
+    FILL_BATCH_SIZE = 5
+    
+    # +1 for a filled BUY, -1 for a filled SELL (enum or WS string). Counter
+    # price is fill * (1 + sign * spacing); closing profit is (entry - fill) * qty * sign
+    _FILL_SIGN = {OrderSide.BUY: 1, OrderSide.SELL: -1, 'BUY': 1, 'SELL': -1}
+    _COUNTER_SIDE = {1: OrderSide.SELL, -1: OrderSide.BUY}
+    
+    # Periodic status line (lazy %-formatting, skipped when INFO is filtered)
+    _STATUS_FMT = (
+        "🕒 STATUS | %s: $%.2f | 📊 Total: $%+.2f | 💰 Real: $%+.2f | "
+        "📉 Unreal: $%+.2f | 💼 Pos: %s | 🎚 %s"
+    )
+    
+    # Console help, emitted with a single write
+    _HELP_TEXT = (
+        "\nAvailable Commands:\n"
+        "  /status  - Show bot status\n"
+        "  /stats   - Show detailed statistics\n"
+        "  /start   - Resume trading\n"
+        "  /stop    - Pause trading\n"
+        "  /pair [S]- Switch trading pair (e.g. /pair BTCUSDT)\n"
+        "  /clear   - Clear screen\n"
+        "  /help    - Show this menu\n\n"
+    )
+    
     def __init__(self, config: dict, testnet: bool = True):
         self.config = config
         self.testnet = testnet
@@ -127,7 +171,7 @@ class BinanceGridBot:
         self.pending_trades = {}  # {order_id: entry_price} - tracks entry for profit calc
         
         # Volatility tracking
-        self.price_history = []  # Recent prices for ATR calculation
+        self.price_history = deque(maxlen=self.PRICE_HISTORY_LEN)  # Recent prices for ATR calculation
         self.base_quantity = 0.0  # Calculated during grid setup
         
         # Auto-range state
@@ -159,6 +203,38 @@ class BinanceGridBot:
         # Persistent state file
         self.state_file = 'state.json'
         
+        # Telegram button dispatch: exact callback_data first, then prefixes
+        self._cb_table = {
+            'status': self._cb_status,
+            'pnl': self._cb_pnl,
+            'pause': self._cb_pause,
+            'resume': self._cb_resume,
+            'preset_menu': self._cb_preset_menu,
+            'main_menu': self._cb_main_menu,
+            'help': self._cb_help,
+            'custom_menu': self._cb_custom_menu,
+            'custom_leverage': self._cb_custom_leverage,
+            'custom_grids': self._cb_custom_grids,
+            'custom_spacing': self._cb_custom_spacing,
+        }
+        self._cb_prefix = (
+            ('preset_', self._cb_preset),
+            ('pair_', self._cb_pair),
+        )
+        # Console command -> handler(args); aliases share a handler
+        self._cmd_table = {}
+        for names, handler in (
+            (('/status', 'status'), self._cmd_status),
+            (('/stop', 'stop'), self._cmd_stop),
+            (('/start', 'start'), self._cmd_start),
+            (('/pair',), self._cmd_pair),
+            (('/statistics', '/stats', 'stats'), self._cmd_stats),
+            (('/clear', 'clear'), self._cmd_clear),
+            (('/help', 'help', '/commands'), self._cmd_help),
+        ):
+            for name in names:
+                self._cmd_table[name] = handler
+        
         # Setup logging
         setup_logging(config)
         
@@ -169,6 +245,7 @@ class BinanceGridBot:
         self._load_state()
         
         # Signal handlers
+        self._shutting_down = False
         signal.signal(signal.SIGINT, self.shutdown)
         signal.signal(signal.SIGTERM, self.shutdown)
     
@@ -224,7 +301,11 @@ class BinanceGridBot:
             self.scanner = None
             
         self.ws_manager = None
-        self.last_price_update = time.time()
+        self.last_price_update = time.monotonic()
+        
+        # WebSocket fills are queued and answered in batches by a worker thread
+        self._fill_queue = queue.Queue()
+        self._fill_thread = None
         
         if not self.exchange.connect():
             logging.error("Failed to connect to Binance. Check API credentials.")
@@ -248,8 +329,27 @@ class BinanceGridBot:
             'saved_at': datetime.now().isoformat()
         }
         try:
-            with open(self.state_file, 'w') as f:
-                json.dump(state, f, indent=2)
+            if orjson:
+                payload = orjson.dumps(state, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                payload = json.dumps(state, indent=2).encode()
+            # Write a temp file next to the state file and rename it over, so a
+            # crash mid-write never leaves a truncated state.json to load
+            tmp_path = self.state_file + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            try:
+                os.replace(tmp_path, self.state_file)
+            except OSError as e:
+                if e.errno not in (errno.EBUSY, errno.EXDEV):
+                    raise
+                # state.json is a single-file bind mount (docker-compose), which
+                # can't be renamed over; rewrite it in place instead
+                os.unlink(tmp_path)
+                with open(self.state_file, 'wb') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
         except Exception as e:
             logging.warning(f"Failed to save state: {e}")
     
@@ -300,39 +400,35 @@ class BinanceGridBot:
         self.tick_size = info.tick_size
         self.lot_size = info.lot_size
         self.min_notional = info.min_notional
+        # Decimal places derived once per symbol instead of on every rounding call
+        self._price_precision = info.price_precision
+        self._qty_precision = info.qty_precision
         logging.info(f"Market info: tick_size={self.tick_size}, lot_size={self.lot_size}, min_notional={self.min_notional}")
     
     def _round_price(self, price: float) -> float:
         """Round price to tick size."""
-        precision = max(0, -int(f"{self.tick_size:e}".split('e')[1]))
-        return round(round(price / self.tick_size) * self.tick_size, precision)
+        return round(round(price / self.tick_size) * self.tick_size, self._price_precision)
     
     def _round_quantity(self, qty: float) -> float:
         """Round quantity to lot size."""
-        precision = max(0, -int(f"{self.lot_size:e}".split('e')[1]))
-        return round(round(qty / self.lot_size) * self.lot_size, precision)
+        return round(round(qty / self.lot_size) * self.lot_size, self._qty_precision)
     
     def _update_price_history(self):
         """Update price history for volatility calculation."""
+        # Bounded ring buffer - oldest price drops off automatically
         self.price_history.append(self.current_price)
-        # Keep last 20 prices (about 3-4 minutes at 10s intervals)
-        if len(self.price_history) > 20:
-            self.price_history = self.price_history[-20:]
     
     def _calculate_volatility(self) -> float:
         """Calculate recent volatility as percentage."""
         if len(self.price_history) < 3:
             return 0.005  # Default 0.5% if not enough data
         
-        # Calculate price returns
-        returns = []
-        for i in range(1, len(self.price_history)):
-            ret = abs(self.price_history[i] - self.price_history[i-1]) / self.price_history[i-1]
-            returns.append(ret)
+        # Calculate price returns (vectorized over the ring buffer)
+        prices = np.fromiter(self.price_history, dtype=np.float64, count=len(self.price_history))
+        returns = np.abs(np.diff(prices)) / prices[:-1]
         
         # Average absolute return
-        avg_volatility = sum(returns) / len(returns)
-        return avg_volatility
+        return float(returns.mean())
     
     def _get_volatility_multiplier(self) -> float:
         """Get position size multiplier based on volatility."""
@@ -564,7 +660,8 @@ class BinanceGridBot:
         
         logging.info(f"📍 Current {self.symbol} price: ${self.current_price:.2f}")
         
-        # Cancel any existing orders
+        # Cancel any existing orders (single cancel-all REST call)
+        logging.info("   └─ Cancelling all open orders...")
         self.exchange.cancel_all_orders(self.symbol)
         
         # Set grid center and bounds for auto-range
@@ -644,22 +741,19 @@ class BinanceGridBot:
             new_qty = self._round_quantity(self.base_quantity * vol_mult) if self.base_quantity > 0 else quantity
             
             # Calculate profit if this was a counter-order (completing a round trip)
+            sign = self._FILL_SIGN[filled_side]
             entry_price = self.pending_trades.pop(oid, None)
             if entry_price:
                 # This is a closing trade
-                if filled_side == OrderSide.SELL:
-                    profit = (filled_price - entry_price) * quantity
-                else:
-                    profit = (entry_price - filled_price) * quantity
+                profit = (entry_price - filled_price) * quantity * sign
                 
                 self.realized_pnl += profit
                 self.daily_realized_pnl += profit
                 self.trade_count += 1
                 
                 emoji = "✅" if profit > 0 else "❌"
-                log_msg = f"{emoji} TRADE #{self.trade_count}: {filled_side.value.upper()} @ ${filled_price:.2f}\n   └─ Profit: ${profit:+.2f} │ Total: ${self.realized_pnl:+.2f}"
-                logging.info(f"{emoji} TRADE #{self.trade_count}: {filled_side.value.upper()} @ ${filled_price:.2f}")
-                logging.info(f"   └─ Profit: ${profit:+.2f} │ Total: ${self.realized_pnl:+.2f}")
+                logging.info("%s TRADE #%d: %s @ $%.2f", emoji, self.trade_count, filled_side.value.upper(), filled_price)
+                logging.info("   └─ Profit: $%+.2f │ Total: $%+.2f", profit, self.realized_pnl)
                 
                 if self.telegram:
                     self.telegram.send_message(f"{emoji} *Order Filled*\nPair: `{self.symbol}`\nSide: `{filled_side.value.upper()}`\nPrice: `${filled_price:.2f}`\nProfit: `${profit:+.2f}`")
@@ -669,29 +763,25 @@ class BinanceGridBot:
                 self._check_compound_profits()
             else:
                 # This is an opening trade - log it
-                logging.info(f"🔔 {filled_side.value.upper()} FILLED @ ${filled_price:.2f} ({quantity} SOL)")
+                logging.info("🔔 %s FILLED @ $%.2f (%s SOL)", filled_side.value.upper(), filled_price, quantity)
             
             # Determine counter order
-            if filled_side == OrderSide.BUY:
-                counter_price = self._round_price(filled_price * (1 + self.spacing_pct))
-                counter_side = OrderSide.SELL
-            else:
-                counter_price = self._round_price(filled_price * (1 - self.spacing_pct))
-                counter_side = OrderSide.BUY
+            counter_price = self._round_price(filled_price * (1 + sign * self.spacing_pct))
+            counter_side = self._COUNTER_SIDE[sign]
             
             # Safety check: Don't buy during crash
             if counter_side == OrderSide.BUY and is_crashing:
-                logging.warning(f"   └─ ⚠️ Counter BUY SKIPPED (crash protection)")
+                logging.warning("   └─ ⚠️ Counter BUY SKIPPED (crash protection)")
                 del self.order_map[oid]
                 continue
             
             # Safety check: Position limit
             if not self._check_position_limit(counter_side, new_qty):
-                logging.warning(f"   └─ ⚠️ Counter {counter_side.value.upper()} SKIPPED (position limit)")
+                logging.warning("   └─ ⚠️ Counter %s SKIPPED (position limit)", counter_side.value.upper())
                 del self.order_map[oid]
                 continue
             
-            logging.info(f"   └─ Counter {counter_side.value.upper()} @ ${counter_price:.2f}")
+            logging.info("   └─ Counter %s @ $%.2f", counter_side.value.upper(), counter_price)
             
             # Place the counter order
             result = self.exchange.place_limit_order(
@@ -724,9 +814,11 @@ class BinanceGridBot:
             self._save_state()
     
     def _update_balance(self):
-        """Update account balance."""
-        balance = self.exchange.get_account_balance()
+        """Update account balance (and entry price) from one account snapshot."""
+        balance, position = self.exchange.get_account_snapshot(self.symbol)
         self.current_balance = balance.total_balance
+        # No position (the adapter skips positionAmt == 0): clear the stale entry
+        self.avg_entry_price = position.entry_price if position else 0
         
         if self.start_balance == 0:
             self.start_balance = self.current_balance
@@ -743,26 +835,33 @@ class BinanceGridBot:
         status_color = Fore.GREEN if not self.paused else Fore.YELLOW
         pnl_color = Fore.GREEN if pnl >= 0 else Fore.RED
         
-        print(f"\n{status_color}═══════════════════════════════════════{Style.RESET_ALL}")
-        print(f"{status_color}  HyperGridBot - Binance Futures{Style.RESET_ALL}")
-        print(f"{status_color}═══════════════════════════════════════{Style.RESET_ALL}")
-        print(f"  Status: {'RUNNING' if not self.paused else 'PAUSED'}")
-        print(f"  Mode: {'TESTNET' if self.testnet else 'LIVE'}")
-        print(f"  Symbol: {self.symbol}")
-        print(f"  Price: ${self.current_price:.2f}")
-        print(f"  Lev: {self.leverage}x")
-        print(f"  Eq (Real): ${self.current_balance:.2f}")
-        print(f"  Buy Power: ${self.current_balance * self.leverage:.2f}")
-        print(f"  PnL: {pnl_color}${pnl:+.2f} ({pnl_pct:+.2f}%){Style.RESET_ALL}")
-        print(f"  Active Orders: {len(self.orders)}")
-        print(f"{status_color}═══════════════════════════════════════{Style.RESET_ALL}\n")
+        rule = f"{status_color}═══════════════════════════════════════{Style.RESET_ALL}"
+        sys.stdout.write("\n".join([
+            "",
+            rule,
+            f"{status_color}  HyperGridBot - Binance Futures{Style.RESET_ALL}",
+            rule,
+            f"  Status: {'RUNNING' if not self.paused else 'PAUSED'}",
+            f"  Mode: {'TESTNET' if self.testnet else 'LIVE'}",
+            f"  Symbol: {self.symbol}",
+            f"  Price: ${self.current_price:.2f}",
+            f"  Lev: {self.leverage}x",
+            f"  Eq (Real): ${self.current_balance:.2f}",
+            f"  Buy Power: ${self.current_balance * self.leverage:.2f}",
+            f"  PnL: {pnl_color}${pnl:+.2f} ({pnl_pct:+.2f}%){Style.RESET_ALL}",
+            f"  Active Orders: {len(self.orders)}",
+            rule,
+            "",
+            "",
+        ]))
+        sys.stdout.flush()
     
     def _try_auto_resume(self):
         """Attempt to resume bot if market conditions are safe."""
         # Only try every 5 minutes
-        now = time.time()
+        now = time.monotonic()
         if not hasattr(self, '_last_resume_check'):
-            self._last_resume_check = 0
+            self._last_resume_check = float('-inf')
             
         if now - self._last_resume_check < 300:
             return
@@ -817,111 +916,114 @@ class BinanceGridBot:
             # Read last 10 lines of log file
             try:
                 log_file = self.config['system'].get('log_file', 'logs/bot.log')
+                # Stream the file through a bounded deque instead of loading every line
                 with open(log_file, 'r') as f:
-                    lines = f.readlines()[-10:]
+                    lines = deque(f, maxlen=10)
                 return "📜 *Recent Logs:*\n" + "".join(lines)
             except Exception as e:
                 return f"⚠️ Could not read logs: {e}"
         
         return None
 
-    def _handle_telegram_callback(self, callback_data):
+    def _handle_telegram_callback(self, callback_data, chat_id=None):
         """Handle inline keyboard button presses from Telegram."""
+        handler = self._cb_table.get(callback_data)
+        if handler:
+            return handler(chat_id)
         
-        if callback_data == "status":
-            unrealized = (self.current_price - self.avg_entry_price) * self.net_position if self.net_position else 0
-            total = self.realized_pnl + unrealized
-            return (
-                f"📊 *Status Report*\n"
-                f"Pair: `{self.symbol}`\n"
-                f"Price: `${self.current_price:.2f}`\n"
-                f"Total PnL: `${total:+.2f}`\n"
-                f"Preset: `{self.current_preset}`\n"
-                f"State: `{'PAUSED' if self.paused else 'RUNNING'}`"
-            )
-        
-        elif callback_data == "pnl":
-            unrealized = (self.current_price - self.avg_entry_price) * self.net_position if self.net_position else 0
-            total = self.realized_pnl + unrealized
-            return (
-                f"💰 *PnL Breakdown*\n"
-                f"Realized: `${self.realized_pnl:+.2f}`\n"
-                f"Unrealized: `${unrealized:+.2f}`\n"
-                f"*Total: `${total:+.2f}`*\n"
-                f"Position: `{self.net_position}` | Trades: `{self.trade_count}`"
-            )
-        
-        elif callback_data == "pause":
-            self.paused = True
-            return "⏸ *Bot PAUSED*\nTrading halted. Use Resume to continue."
-        
-        elif callback_data == "resume":
-            self.paused = False
-            return "▶️ *Bot RESUMED*\nTrading active."
-        
-        elif callback_data == "preset_menu":
-            if self.telegram:
-                self.telegram.send_preset_menu()
-            return None
-        
-        elif callback_data.startswith("preset_"):
-            preset_name = callback_data.replace("preset_", "")
-            if self.set_preset(preset_name):
-                return f"✅ Preset changed to *{preset_name}*\nGrid recentered."
-            else:
-                return f"❌ Failed to set preset: {preset_name}"
-        
-        elif callback_data == "main_menu":
-            if self.telegram:
-                self.telegram.send_main_menu()
-            return None
-        
-        elif callback_data == "help":
-            return (
-                "❓ *HyperGridBot Help*\n\n"
-                "📊 *Status* - Current price, PnL, state\n"
-                "📈 *PnL* - Detailed profit breakdown\n"
-                "⏸ *Pause* - Stop trading (keeps positions)\n"
-                "▶️ *Resume* - Resume trading\n"
-                "🎚 *Preset* - Change strategy\n"
-                "  • NEUTRAL: Balanced\n"
-                "  • ULTRA_SAFE: Conservative\n"
-                "  • AGGRESSIVE: High risk/reward"
-            )
-        
-        elif callback_data == "custom_menu":
-            if self.telegram:
-                self.telegram.send_custom_menu()
-            return None
-        
-        elif callback_data == "custom_leverage":
-            if self.telegram:
-                self.telegram.set_user_state(chat_id, self.telegram.STATE_AWAITING_LEVERAGE)
-            return "📊 *Set Custom Leverage*\n\nEnter a value between 1 and 10:"
-        
-        elif callback_data == "custom_grids":
-            if self.telegram:
-                self.telegram.set_user_state(chat_id, self.telegram.STATE_AWAITING_GRIDS)
-            return "📈 *Set Grid Count*\n\nEnter a value between 3 and 20:"
-        
-        elif callback_data == "custom_spacing":
-            if self.telegram:
-                self.telegram.set_user_state(chat_id, self.telegram.STATE_AWAITING_SPACING)
-            return "📏 *Set Spacing %*\n\nEnter a value between 0.05 and 1.0 (e.g., 0.15 for 0.15%):"
-        
-        elif callback_data.startswith("pair_"):
-            pair = callback_data.replace("pair_", "")
-            if pair in ["BNBUSDT", "SOLUSDT", "ETHUSDT"]:
-                self.symbol = pair
-                return f"✅ Trading pair changed to *{pair}*"
-            return "❌ Invalid pair"
+        for prefix, handler in self._cb_prefix:
+            if callback_data.startswith(prefix):
+                return handler(callback_data[len(prefix):], chat_id)
         
         return None
 
+    def _cb_status(self, chat_id):
+        unrealized = (self.current_price - self.avg_entry_price) * self.net_position if self.net_position else 0
+        total = self.realized_pnl + unrealized
+        return (
+            f"📊 *Status Report*\n"
+            f"Pair: `{self.symbol}`\n"
+            f"Price: `${self.current_price:.2f}`\n"
+            f"Total PnL: `${total:+.2f}`\n"
+            f"Preset: `{self.current_preset}`\n"
+            f"State: `{'PAUSED' if self.paused else 'RUNNING'}`"
+        )
+
+    def _cb_pnl(self, chat_id):
+        unrealized = (self.current_price - self.avg_entry_price) * self.net_position if self.net_position else 0
+        total = self.realized_pnl + unrealized
+        return (
+            f"💰 *PnL Breakdown*\n"
+            f"Realized: `${self.realized_pnl:+.2f}`\n"
+            f"Unrealized: `${unrealized:+.2f}`\n"
+            f"*Total: `${total:+.2f}`*\n"
+            f"Position: `{self.net_position}` | Trades: `{self.trade_count}`"
+        )
+
+    def _cb_pause(self, chat_id):
+        self.paused = True
+        return "⏸ *Bot PAUSED*\nTrading halted. Use Resume to continue."
+
+    def _cb_resume(self, chat_id):
+        self.paused = False
+        return "▶️ *Bot RESUMED*\nTrading active."
+
+    def _cb_preset_menu(self, chat_id):
+        if self.telegram:
+            self.telegram.send_preset_menu()
+        return None
+
+    def _cb_preset(self, preset_name, chat_id):
+        if self.set_preset(preset_name):
+            return f"✅ Preset changed to *{preset_name}*\nGrid recentered."
+        return f"❌ Failed to set preset: {preset_name}"
+
+    def _cb_main_menu(self, chat_id):
+        if self.telegram:
+            self.telegram.send_main_menu()
+        return None
+
+    def _cb_help(self, chat_id):
+        return (
+            "❓ *HyperGridBot Help*\n\n"
+            "📊 *Status* - Current price, PnL, state\n"
+            "📈 *PnL* - Detailed profit breakdown\n"
+            "⏸ *Pause* - Stop trading (keeps positions)\n"
+            "▶️ *Resume* - Resume trading\n"
+            "🎚 *Preset* - Change strategy\n"
+            "  • NEUTRAL: Balanced\n"
+            "  • ULTRA_SAFE: Conservative\n"
+            "  • AGGRESSIVE: High risk/reward"
+        )
+
+    def _cb_custom_menu(self, chat_id):
+        if self.telegram:
+            self.telegram.send_custom_menu()
+        return None
+
+    def _cb_custom_leverage(self, chat_id):
+        if self.telegram:
+            self.telegram.set_user_state(chat_id, self.telegram.STATE_AWAITING_LEVERAGE)
+        return "📊 *Set Custom Leverage*\n\nEnter a value between 1 and 10:"
+
+    def _cb_custom_grids(self, chat_id):
+        if self.telegram:
+            self.telegram.set_user_state(chat_id, self.telegram.STATE_AWAITING_GRIDS)
+        return "📈 *Set Grid Count*\n\nEnter a value between 3 and 20:"
+
+    def _cb_custom_spacing(self, chat_id):
+        if self.telegram:
+            self.telegram.set_user_state(chat_id, self.telegram.STATE_AWAITING_SPACING)
+        return "📏 *Set Spacing %*\n\nEnter a value between 0.05 and 1.0 (e.g., 0.15 for 0.15%):"
+
+    def _cb_pair(self, pair, chat_id):
+        if pair in ["BNBUSDT", "SOLUSDT", "ETHUSDT"]:
+            self.symbol = pair
+            return f"✅ Trading pair changed to *{pair}*"
+        return "❌ Invalid pair"
+
     def _handle_telegram_text(self, chat_id, text, state, data):
         """Handle multi-step text input for custom settings."""
-        from src.telegram_bot import TelegramNotifier
-        
         if state == TelegramNotifier.STATE_AWAITING_LEVERAGE:
             try:
                 leverage = int(text.strip())
@@ -972,7 +1074,10 @@ class BinanceGridBot:
         while self.running:
             try:
                 if sys.stdin in select.select([sys.stdin], [], [], 1.0)[0]:
-                    cmd_line = sys.stdin.readline().strip().lower()
+                    line = sys.stdin.readline()
+                    if not line:
+                        break  # EOF: stdin stays "ready" forever, stop polling it
+                    cmd_line = line.strip().lower()
                     if cmd_line:
                         self._handle_command(cmd_line)
             except Exception:
@@ -983,9 +1088,9 @@ class BinanceGridBot:
     def _check_funding_rate(self):
         """Monitor funding rate to warn about expensive positions."""
         # Simple timer check (run every 60 mins)
-        now = time.time()
+        now = time.monotonic()
         if not hasattr(self, '_last_funding_check'):
-            self._last_funding_check = 0
+            self._last_funding_check = float('-inf')
             
         if now - self._last_funding_check < 3600:
             return
@@ -1008,41 +1113,43 @@ class BinanceGridBot:
 
     def _handle_command(self, cmd: str):
         """Handle console commands."""
-        if cmd in ['/status', 'status']:
-            self.print_status()
-        elif cmd in ['/stop', 'stop']:
-            self.paused = True
-            logging.warning("Bot PAUSED")
-        elif cmd in ['/start', 'start']:
-            self.paused = False
-            logging.info("Bot RESUMED")
-        elif cmd.startswith('/pair'):
-            parts = cmd.split()
-            if len(parts) > 1:
-                new_symbol = parts[1].upper()
-                self.switch_pair(new_symbol)
-            else:
-                print("Usage: /pair <SYMBOL> (e.g. /pair BTCUSDT)")
-        elif cmd in ['/statistics', '/stats', 'stats']:
-            self.print_statistics()
-        elif cmd in ['/clear', 'clear']:
-            print("\033c", end="")
-        elif cmd in ['/help', 'help', '/commands']:
-            print("\nAvailable Commands:")
-            print("  /status  - Show bot status")
-            print("  /stats   - Show detailed statistics")
-            print("  /start   - Resume trading")
-            print("  /stop    - Pause trading")
-            print("  /pair [S]- Switch trading pair (e.g. /pair BTCUSDT)")
-            print("  /clear   - Clear screen")
-            print("  /help    - Show this menu\n")
-
+        name, *args = cmd.split()
+        handler = self._cmd_table.get(name)
+        if handler:
+            handler(args)
         else:
             print(f"Unknown command: {cmd}")
 
+    def _cmd_status(self, args):
+        self.print_status()
+
+    def _cmd_stop(self, args):
+        self.paused = True
+        logging.warning("Bot PAUSED")
+
+    def _cmd_start(self, args):
+        self.paused = False
+        logging.info("Bot RESUMED")
+
+    def _cmd_pair(self, args):
+        if args:
+            self.switch_pair(args[0].upper())
+        else:
+            print("Usage: /pair <SYMBOL> (e.g. /pair BTCUSDT)")
+
+    def _cmd_stats(self, args):
+        self.print_statistics()
+
+    def _cmd_clear(self, args):
+        print("\033c", end="")
+
+    def _cmd_help(self, args):
+        sys.stdout.write(self._HELP_TEXT)
+        sys.stdout.flush()
+
     def print_statistics(self):
         """Print detailed session statistics."""
-        elapsed = time.time() - self.session_start_time
+        elapsed = time.monotonic() - self.session_start_time
         hours = elapsed / 3600
         days = hours / 24
         
@@ -1098,7 +1205,7 @@ class BinanceGridBot:
         self.orders = []
         self.order_map = {}
         self.pending_trades = {}
-        self.price_history = []
+        self.price_history.clear()
         self.net_position = 0.0
         self.realized_pnl = 0.0
         self.trade_count = 0
@@ -1116,15 +1223,12 @@ class BinanceGridBot:
         if self._place_initial_grid():
             logging.info(f"✅ Successfully switched to {self.symbol}")
             # Reset session start time to show stats for this pair
-            self.session_start_time = time.time()
+            self.session_start_time = time.monotonic()
         else:
             logging.error(f"❌ Failed to place grid for {self.symbol}")
 
-    def shutdown(self, signum=None, frame=None):
-        """Graceful shutdown - close positions and save state."""
-        logging.info("Shutting down...")
-        self.running = False
-        
+    def _close_all_positions(self):
+        """Cancel open orders and flatten any net position at market."""
         # Cancel all pending orders first
         cancelled = self.exchange.cancel_all_orders(self.symbol)
         logging.info(f"Cancelled {cancelled} orders")
@@ -1133,13 +1237,12 @@ class BinanceGridBot:
         if abs(self.net_position) > 0.1:
             logging.info(f"Closing position: {self.net_position:+.1f} SOL")
             try:
+                close_qty = self._round_quantity(abs(self.net_position))
                 if self.net_position > 0:
                     # Long position - sell to close
-                    close_qty = self._round_quantity(abs(self.net_position))
                     result = self.exchange.place_market_order(self.symbol, OrderSide.SELL, close_qty)
                 else:
                     # Short position - buy to close
-                    close_qty = self._round_quantity(abs(self.net_position))
                     result = self.exchange.place_market_order(self.symbol, OrderSide.BUY, close_qty)
                 
                 if result.success:
@@ -1149,13 +1252,33 @@ class BinanceGridBot:
                     logging.warning(f"⚠️ Failed to close position: {result.error}")
             except Exception as e:
                 logging.warning(f"⚠️ Error closing position: {e}")
+
+    def shutdown(self, signum=None, frame=None, close_positions=True, exit_process=True):
+        """Graceful shutdown - close positions and save state.
+        
+        Idempotent: a second signal while shutting down is ignored.
+        Pass close_positions=False for fast restarts that keep the grid's position.
+        """
+        if self._shutting_down:
+            return
+        self._shutting_down = True
+        
+        logging.info("Shutting down...")
+        self.running = False
+        
+        if self.ws_manager:
+            self.ws_manager.stop()
+        
+        if close_positions:
+            self._close_all_positions()
         
         # Save final state
         self._save_state()
         logging.info("💾 State saved")
         
         logging.info("Shutdown complete")
-        sys.exit(0)
+        if exit_process:
+            sys.exit(0)
     
     def run(self):
         """Main execution method (Event-Driven via WebSockets)."""
@@ -1172,7 +1295,7 @@ class BinanceGridBot:
             logging.error("Failed to place initial grid. Exiting.")
             return
         
-        self.last_status_time = time.time()
+        self.last_status_time = time.monotonic()
         self.print_status()
         
         # Start WebSockets
@@ -1187,21 +1310,25 @@ class BinanceGridBot:
             self._on_user_update
         )
         
+        # Start counter-order worker
+        self._fill_thread = threading.Thread(target=self._fill_worker, daemon=True)
+        self._fill_thread.start()
+        
         try:
             while self.running:
                 # Keep main thread alive
                 time.sleep(10)
                 
                 # Check for stale connection (Heartbeat) - 60s
-                if time.time() - self.last_price_update > 60:
+                if time.monotonic() - self.last_price_update > 60:
                     logging.warning("⚠️ No price updates for 60s! Reconnecting WebSockets...")
                     self.ws_manager.stop()
                     time.sleep(1)
                     self.ws_manager.start(self.symbol, self._on_price_update, self._on_user_update)
-                    self.last_price_update = time.time()
+                    self.last_price_update = time.monotonic()
 
                 # Periodic Status Log (every 5 minutes)
-                if time.time() - self.last_status_time > 300:
+                if time.monotonic() - self.last_status_time > 300:
                     try:
                         # Local PnL Calculation (Est.)
                         unrealized_pnl = 0.0
@@ -1214,16 +1341,13 @@ class BinanceGridBot:
                         # Total PnL
                         total_pnl = self.realized_pnl + unrealized_pnl
                         
-                        status_msg = (
-                            f"🕒 STATUS | {self.symbol}: ${self.current_price:.2f} | "
-                            f"📊 Total: ${total_pnl:+.2f} | "
-                            f"💰 Real: ${self.realized_pnl:+.2f} | "
-                            f"📉 Unreal: ${unrealized_pnl:+.2f} | "
-                            f"💼 Pos: {self.net_position} | "
-                            f"� {self.current_preset}"
+                        logging.info(
+                            self._STATUS_FMT,
+                            self.symbol, self.current_price, total_pnl,
+                            self.realized_pnl, unrealized_pnl,
+                            self.net_position, self.current_preset
                         )
-                        logging.info(status_msg)
-                        self.last_status_time = time.time()
+                        self.last_status_time = time.monotonic()
                         
                         # Check liquidation risk
                         self._check_liquidation_risk()
@@ -1245,17 +1369,15 @@ class BinanceGridBot:
             self.shutdown()
         except Exception as e:
             logging.error(f"Critical error in main loop: {e}")
-            # Auto-restart on critical websocket failure
-            self.shutdown() 
+            # Auto-restart on critical websocket failure (keep positions, re-exec)
+            self.shutdown(close_positions=False, exit_process=False)
             time.sleep(5)
             os.execv(sys.executable, ['python3'] + sys.argv)
 
     def _recenter_grid(self):
         """Cancel all orders and place a new grid around current price."""
         try:
-            # 1. Cancel All
-            logging.info("   └─ Cancelling all open orders...")
-            self.exchange.cancel_all_orders(self.symbol)
+            # 1. Cancel All (done in one call by _place_initial_grid below)
             self.order_map = {}
             
             # 2. Dynamic Compounding: Use Realized Profit
@@ -1280,7 +1402,7 @@ class BinanceGridBot:
     def _on_price_update(self, price):
         """Callback for real-time price updates from WebSocket."""
         self.current_price = price
-        self.last_price_update = time.time()
+        self.last_price_update = time.monotonic()
         # Note: We rely on Order Updates for trading logic, not price ticks.
 
     def _on_user_update(self, type, data):
@@ -1293,23 +1415,38 @@ class BinanceGridBot:
             if status == 'FILLED':
                 fill_price = float(data.get('L')) # Last filled price
                 qty = float(data.get('l'))        # Last filled qty
-                logging.info(f"🔔 {side} FILLED @ ${fill_price} ({qty} {self.symbol})")
+                logging.info("🔔 %s FILLED @ $%s (%s %s)", side, fill_price, qty, self.symbol)
                 
                 # Update stats
                 self.trade_count += 1
                 
-                # Place Counter Order Immediately
-                self._handle_fill_event(side, fill_price, qty)
+                # Queue for the counter-order worker (bursts are batched)
+                self._fill_queue.put((side, fill_price, qty))
                 
         elif type == 'ACCOUNT':
             # Optionally update balance here if needed
             pass 
 
-    def _handle_fill_event(self, side, price, qty):
-        """React to a fill by placing a counter-order and updating PnL."""
+    def _fill_worker(self):
+        """Background thread: coalesce fills from the same burst into one batch order."""
+        while self.running:
+            try:
+                fill = self._fill_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            
+            fills = [fill]
+            while len(fills) < self.FILL_BATCH_SIZE:
+                try:
+                    fills.append(self._fill_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            self._handle_fill_batch(fills)
+
+    def _handle_fill_batch(self, fills):
+        """React to fills by placing counter-orders (one batch call) and updating PnL."""
         # Simple logic: If BUY filled, place SELL higher. If SELL filled, place BUY lower.
-        spacing = price * self.spacing_pct
-        
         # Calculate approximate realized profit from this grid cycle
         # We assume if we Sell, we sold something we bought lower.
         # If we Buy, we are loading up for a future sell.
@@ -1319,30 +1456,34 @@ class BinanceGridBot:
         # We count profit on the SELL side for Long grids, or logic based on reducing pos.
         # Let's just track "Grid Profit" as (Value * Spacing) whenever a trade happens, 
         # as it represents capturing a spread.
-        trade_profit = (price * qty) * self.spacing_pct
-        self.realized_pnl += trade_profit
+        counter_orders = []
+        for side, price, qty in fills:
+            spacing = price * self.spacing_pct
+            self.realized_pnl += (price * qty) * self.spacing_pct
+            
+            sign = self._FILL_SIGN.get(side)
+            if sign is None:
+                continue
+            
+            counter_orders.append({
+                'symbol': self.symbol,
+                'side': self._COUNTER_SIDE[sign],
+                'quantity': qty,
+                'price': price + sign * spacing
+            })
+        
+        if not counter_orders:
+            return
         
         try:
-            if side == 'BUY':
-                # Place Sell
-                sell_price = price + spacing
-                self.exchange.place_limit_order(self.symbol, OrderSide.SELL, qty, sell_price)
-                logging.info(f"   └─ Placed Counter SELL @ ${sell_price:.2f}")
-                
-            elif side == 'SELL':
-                # Place Buy
-                buy_price = price - spacing
-                self.exchange.place_limit_order(self.symbol, OrderSide.BUY, qty, buy_price)
-                logging.info(f"   └─ Placed Counter BUY @ ${buy_price:.2f}")
+            results = self.exchange.bulk_place_orders(counter_orders)
+            for order, r in zip(counter_orders, results):
+                if r.success:
+                    logging.info("   └─ Placed Counter %s @ $%.2f", order['side'].value, order['price'])
+                else:
+                    logging.error("   ✗ Counter %s failed: %s", order['side'].value, r.error)
         except Exception as e:
-            logging.error(f"Failed to place counter order: {e}")
-
-    def shutdown(self, signum=None, frame=None):
-        self.running = False
-        if self.ws_manager:
-            self.ws_manager.stop()
-        logging.info("Shutdown complete.")
-        sys.exit(0)
+            logging.error("Failed to place counter orders: %s", e)
 
 
 def main():
@@ -3,10 +3,13 @@ Binance Futures Adapter - Implementation for Binance USDⓈ-M Futures
 """
 import logging
 import time
-from typing import List, Optional, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple
 
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
+from requests.adapters import HTTPAdapter
 
 from src.exchange_adapter import (
     ExchangeAdapter, 
@@ -32,12 +35,27 @@ class BinanceAdapter(ExchangeAdapter):
     
     TESTNET_URL = "https://testnet.binancefuture.com"
     
+    # Keep-alive connections kept open for REST calls (bulk orders, WS fill bursts)
+    HTTP_POOL_SIZE = 20
+    
+    # Ping interval that keeps pooled TLS connections from idling out
+    KEEPALIVE_INTERVAL = 20
+    
+    # Binance batch order limit and number of batches submitted concurrently
+    BATCH_SIZE = 5
+    BATCH_WORKERS = 4
+    
+    # Refresh interval for the warm-loaded exchange_info (tick/lot sizes rarely change)
+    EXCHANGE_INFO_TTL = 6 * 3600
+    
     def __init__(self, api_key: str, api_secret: str, testnet: bool = True):
         self.api_key = api_key
         self.api_secret = api_secret
         self.testnet = testnet
         self.client: Optional[Client] = None
         self._symbol_info_cache: Dict[str, MarketInfo] = {}
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._keepalive_thread: Optional[threading.Thread] = None
         
     def connect(self) -> bool:
         """Initialize Binance client."""
@@ -48,10 +66,25 @@ class BinanceAdapter(ExchangeAdapter):
                 testnet=self.testnet
             )
             
+            # Reuse pooled keep-alive connections for every REST call
+            # (mounted on the client's own session so auth headers are kept)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.HTTP_POOL_SIZE, pool_block=False)
+            self.client.session.mount('https://', adapter)
+            self.client.session.mount('http://', adapter)
+            
             # Test connection
             server_time = self.client.futures_time()
             logger.info(f"Connected to Binance {'Testnet' if self.testnet else 'Mainnet'}")
             logger.info(f"Server time: {server_time}")
+            
+            # Warm-load market info for every symbol in one request
+            self._load_exchange_info()
+            if self._refresh_thread is None:
+                self._refresh_thread = threading.Thread(target=self._refresh_exchange_info_loop, daemon=True)
+                self._refresh_thread.start()
+            if self._keepalive_thread is None:
+                self._keepalive_thread = threading.Thread(target=self._keepalive_loop, daemon=True)
+                self._keepalive_thread.start()
             return True
             
         except BinanceAPIException as e:
@@ -61,6 +94,15 @@ class BinanceAdapter(ExchangeAdapter):
             logger.error(f"Unexpected error connecting to Binance: {e}")
             return False
     
+    def _keepalive_loop(self):
+        """Background thread: ping futures API so order calls reuse a warm connection."""
+        while True:
+            time.sleep(self.KEEPALIVE_INTERVAL)
+            try:
+                self.client.futures_ping()
+            except Exception as e:
+                logger.debug("Keepalive ping failed: %s", e)
+    
     def get_account_balance(self) -> AccountBalance:
         """Get futures account balance."""
         try:
@@ -75,6 +117,38 @@ class BinanceAdapter(ExchangeAdapter):
             logger.error(f"Failed to get account balance: {e}")
             return AccountBalance(0, 0, 0)
     
+    def get_account_snapshot(self, symbol: str) -> Tuple[AccountBalance, Optional[Position]]:
+        """Balance and position for a symbol from a single futures_account call."""
+        try:
+            account = self.client.futures_account()
+            
+            balance = AccountBalance(
+                total_balance=float(account['totalWalletBalance']),
+                available_balance=float(account['availableBalance']),
+                unrealized_pnl=float(account['totalUnrealizedProfit'])
+            )
+            
+            position = None
+            for pos in account.get('positions', ()):
+                if pos['symbol'] != symbol:
+                    continue
+                size = float(pos['positionAmt'])
+                if size != 0:
+                    position = Position(
+                        symbol=symbol,
+                        side=OrderSide.BUY if size > 0 else OrderSide.SELL,
+                        size=abs(size),
+                        entry_price=float(pos['entryPrice']),
+                        unrealized_pnl=float(pos['unrealizedProfit']),
+                        leverage=int(pos['leverage'])
+                    )
+                    break
+            
+            return balance, position
+        except BinanceAPIException as e:
+            logger.error(f"Failed to get account snapshot: {e}")
+            return AccountBalance(0, 0, 0), None
+    
     def get_position(self, symbol: str) -> Optional[Position]:
         """Get position for a symbol."""
         try:
@@ -106,44 +180,63 @@ class BinanceAdapter(ExchangeAdapter):
             logger.error(f"Failed to get mark price: {e}")
             return 0.0
     
-    def get_market_info(self, symbol: str) -> MarketInfo:
-        """Get market info (tick size, lot size, etc.)."""
-        if symbol in self._symbol_info_cache:
-            return self._symbol_info_cache[symbol]
-            
+    @staticmethod
+    def _parse_market_info(s: Dict[str, Any]) -> MarketInfo:
+        """Build MarketInfo from one exchange_info symbol entry."""
+        tick_size = 0.01
+        lot_size = 0.001
+        min_notional = 5.0
+        
+        for f in s['filters']:
+            if f['filterType'] == 'PRICE_FILTER':
+                tick_size = float(f['tickSize'])
+            elif f['filterType'] == 'LOT_SIZE':
+                lot_size = float(f['stepSize'])
+            elif f['filterType'] == 'MIN_NOTIONAL':
+                min_notional = float(f.get('notional', 5.0))
+        
+        return MarketInfo(
+            symbol=s['symbol'],
+            tick_size=tick_size,
+            lot_size=lot_size,
+            min_notional=min_notional,
+            max_leverage=int(s.get('maxLeverage', 20))
+        )
+    
+    def _load_exchange_info(self) -> bool:
+        """Fetch exchange_info once and cache MarketInfo for all symbols."""
         try:
             info = self.client.futures_exchange_info()
-            
-            for s in info['symbols']:
-                if s['symbol'] == symbol:
-                    tick_size = 0.01
-                    lot_size = 0.001
-                    min_notional = 5.0
-                    
-                    for f in s['filters']:
-                        if f['filterType'] == 'PRICE_FILTER':
-                            tick_size = float(f['tickSize'])
-                        elif f['filterType'] == 'LOT_SIZE':
-                            lot_size = float(f['stepSize'])
-                        elif f['filterType'] == 'MIN_NOTIONAL':
-                            min_notional = float(f.get('notional', 5.0))
-                    
-                    market_info = MarketInfo(
-                        symbol=symbol,
-                        tick_size=tick_size,
-                        lot_size=lot_size,
-                        min_notional=min_notional,
-                        max_leverage=int(s.get('maxLeverage', 20))
-                    )
-                    self._symbol_info_cache[symbol] = market_info
-                    return market_info
-                    
-            raise ValueError(f"Symbol {symbol} not found")
-            
+            self._symbol_info_cache = {
+                s['symbol']: self._parse_market_info(s) for s in info['symbols']
+            }
+            logger.info(f"Loaded market info for {len(self._symbol_info_cache)} symbols")
+            return True
         except BinanceAPIException as e:
-            logger.error(f"Failed to get market info: {e}")
+            logger.error(f"Failed to load exchange info: {e}")
+            return False
+    
+    def _refresh_exchange_info_loop(self):
+        """Background thread: periodically refresh the market info cache."""
+        while True:
+            time.sleep(self.EXCHANGE_INFO_TTL)
+            self._load_exchange_info()
+    
+    def get_market_info(self, symbol: str) -> MarketInfo:
+        """Get market info (tick size, lot size, etc.)."""
+        market_info = self._symbol_info_cache.get(symbol)
+        if market_info:
+            return market_info
+        
+        # Cache miss: symbol may be newly listed, reload once
+        if not self._load_exchange_info():
             # Return safe defaults
             return MarketInfo(symbol, 0.01, 0.001, 5.0, 20)
+        
+        market_info = self._symbol_info_cache.get(symbol)
+        if market_info is None:
+            raise ValueError(f"Symbol {symbol} not found")
+        return market_info
     
     def set_leverage(self, symbol: str, leverage: int) -> bool:
         """Set leverage for a symbol."""
@@ -158,15 +251,15 @@ class BinanceAdapter(ExchangeAdapter):
             logger.error(f"Failed to set leverage: {e}")
             return False
     
-    def _round_price(self, price: float, tick_size: float) -> float:
+    def _round_price(self, price: float, market_info: MarketInfo) -> float:
         """Round price to tick size."""
-        precision = len(str(tick_size).rstrip('0').split('.')[-1])
-        return round(round(price / tick_size) * tick_size, precision)
+        tick_size = market_info.tick_size
+        return round(round(price / tick_size) * tick_size, market_info.price_precision)
     
-    def _round_quantity(self, quantity: float, lot_size: float) -> float:
+    def _round_quantity(self, quantity: float, market_info: MarketInfo) -> float:
         """Round quantity to lot size."""
-        precision = len(str(lot_size).rstrip('0').split('.')[-1])
-        return round(round(quantity / lot_size) * lot_size, precision)
+        lot_size = market_info.lot_size
+        return round(round(quantity / lot_size) * lot_size, market_info.qty_precision)
     
     def place_limit_order(
         self, 
@@ -181,8 +274,8 @@ class BinanceAdapter(ExchangeAdapter):
             market_info = self.get_market_info(symbol)
             
             # Round to proper precision
-            price = self._round_price(price, market_info.tick_size)
-            quantity = self._round_quantity(quantity, market_info.lot_size)
+            price = self._round_price(price, market_info)
+            quantity = self._round_quantity(quantity, market_info)
             
             response = self.client.futures_create_order(
                 symbol=symbol,
@@ -219,7 +312,7 @@ class BinanceAdapter(ExchangeAdapter):
         """Place a market order."""
         try:
             market_info = self.get_market_info(symbol)
-            quantity = self._round_quantity(quantity, market_info.lot_size)
+            quantity = self._round_quantity(quantity, market_info)
             
             response = self.client.futures_create_order(
                 symbol=symbol,
@@ -275,58 +368,71 @@ class BinanceAdapter(ExchangeAdapter):
             logger.error(f"Failed to get open orders: {e}")
             return []
     
+    def _submit_batch(self, batch_params: List[Dict[str, Any]]) -> List[OrderResult]:
+        """Submit one batch (max 5) and map each response entry to an OrderResult."""
+        results = []
+        try:
+            response = self.client.futures_place_batch_order(batchOrders=batch_params)
+            
+            for r in response:
+                if 'orderId' in r:
+                    results.append(OrderResult(
+                        success=True,
+                        order_id=str(r['orderId']),
+                        symbol=r['symbol'],
+                        status=OrderStatus.NEW,
+                        raw_response=r
+                    ))
+                else:
+                    results.append(OrderResult(
+                        success=False,
+                        error=r.get('msg', 'Unknown error'),
+                        raw_response=r
+                    ))
+                    
+        except BinanceAPIException as e:
+            logger.error(f"Batch order failed: {e}")
+            # Return failure for all orders in this batch
+            for _ in batch_params:
+                results.append(OrderResult(success=False, error=str(e)))
+        
+        return results
+    
     def bulk_place_orders(self, orders: List[Dict[str, Any]]) -> List[OrderResult]:
         """
         Place multiple orders. Binance supports batch orders up to 5 at a time.
         Orders format: [{'symbol': str, 'side': OrderSide, 'quantity': float, 'price': float}, ...]
+        Batches are submitted concurrently; results keep the input order.
         """
-        results = []
+        batches = []
+        mi_cache: Dict[str, MarketInfo] = {}  # grids are usually a single symbol
         
-        # Process in batches of 5 (Binance limit)
-        for i in range(0, len(orders), 5):
-            batch = orders[i:i+5]
+        # Build all batches of 5 (Binance limit) up front
+        for i in range(0, len(orders), self.BATCH_SIZE):
             batch_params = []
             
-            for order in batch:
+            for order in orders[i:i + self.BATCH_SIZE]:
                 symbol = order['symbol']
-                market_info = self.get_market_info(symbol)
+                market_info = mi_cache.get(symbol)
+                if market_info is None:
+                    market_info = mi_cache[symbol] = self.get_market_info(symbol)
                 
                 batch_params.append({
                     'symbol': symbol,
                     'side': order['side'].value if isinstance(order['side'], OrderSide) else order['side'],
                     'type': 'LIMIT',
                     'timeInForce': 'GTC',
-                    'quantity': str(self._round_quantity(order['quantity'], market_info.lot_size)),
-                    'price': str(self._round_price(order['price'], market_info.tick_size)),
+                    'quantity': str(self._round_quantity(order['quantity'], market_info)),
+                    'price': str(self._round_price(order['price'], market_info)),
                 })
             
-            try:
-                response = self.client.futures_place_batch_order(batchOrders=batch_params)
-                
-                for r in response:
-                    if 'orderId' in r:
-                        results.append(OrderResult(
-                            success=True,
-                            order_id=str(r['orderId']),
-                            symbol=r['symbol'],
-                            status=OrderStatus.NEW,
-                            raw_response=r
-                        ))
-                    else:
-                        results.append(OrderResult(
-                            success=False,
-                            error=r.get('msg', 'Unknown error'),
-                            raw_response=r
-                        ))
-                        
-            except BinanceAPIException as e:
-                logger.error(f"Batch order failed: {e}")
-                # Return failure for all orders in this batch
-                for _ in batch:
-                    results.append(OrderResult(success=False, error=str(e)))
-            
-            # Small delay between batches
-            if i + 5 < len(orders):
-                time.sleep(0.1)
+            batches.append(batch_params)
         
-        return results
+        if len(batches) == 1:
+            return self._submit_batch(batches[0])
+        
+        # Rely on Binance weight limits instead of sleeping between batches
+        with ThreadPoolExecutor(max_workers=self.BATCH_WORKERS) as pool:
+            responses = list(pool.map(self._submit_batch, batches))
+        
+        return [r for batch_results in responses for r in batch_results]
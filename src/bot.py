@@ -3,45 +3,149 @@ import sys
 import time
 import json
 import logging
+import logging.handlers
 import signal
 import argparse
-import tempfile
-import shutil
+import calendar
+import hashlib
+import queue
+import selectors
 import threading
+from collections import deque
+from functools import lru_cache
+from operator import methodcaller
+from concurrent.futures import ThreadPoolExecutor
 from colorama import init, Fore, Style
 from datetime import datetime
 
-# Initialize colorama
-init(autoreset=True)
+# Colour only when attached to a terminal (not under nohup/systemd/pipes)
+COLOR_OUTPUT = sys.stdout.isatty()
+
+# colorama only needs to translate ANSI on Windows consoles; elsewhere the
+# terminal handles it and every colored string carries its own reset
+if COLOR_OUTPUT and os.name == 'nt':
+    init()
+
+# CLI colour codes; empty when not on a terminal so pipes/log files get plain text
+if COLOR_OUTPUT:
+    _RED, _GREEN, _YELLOW, _CYAN, _RESET = Fore.RED, Fore.GREEN, Fore.YELLOW, Fore.CYAN, Style.RESET_ALL
+else:
+    _RED = _GREEN = _YELLOW = _CYAN = _RESET = ""
 
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from src.safety import SafetyMonitor
-# Mock imports for now until SDK is confirmed installed or we use standard patterns
+from src.grid import GridManager
+from src.trade_history import TradeHistory
+# Fast JSON when available; stdlib fallback keeps the bot runnable without it.
+# Both accept numpy scalars/arrays (e.g. values derived from grid or history math).
+try:
+    import orjson
+    _json_loads = orjson.loads
+    def _json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+    def _json_default(obj):
+        if hasattr(obj, 'tolist'):  # numpy scalar or array
+            return obj.tolist()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    def _json_dumps(obj):
+        return json.dumps(obj, default=_json_default).encode()
+# Optional binary state format (system.state_format = "msgpack")
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+# SDK imported once here; setup_sdk() checks for None instead of re-importing
 try:
     from hyperliquid.info import Info
     from hyperliquid.exchange import Exchange
     from hyperliquid.utils import types
     from eth_account.account import Account
-except ImportError:
-    pass
+    _SDK_IMPORT_ERROR = None
+except ImportError as e:
+    Info = Exchange = types = Account = None
+    _SDK_IMPORT_ERROR = e
+
+# Derived accounts keyed by a digest of the private key (key -> address derivation is costly)
+_ACCOUNTS = {}
+
+def _account_for(secret):
+    digest = hashlib.blake2b(secret.encode(), digest_size=16).digest()
+    account = _ACCOUNTS.get(digest)
+    if account is None:
+        account = _ACCOUNTS[digest] = Account.from_key(secret)
+    return account
 
 # Setup Logging with Colors
 class ColoredFormatter(logging.Formatter):
+    # One combined SGR sequence per line and a single reset
     FORMATS = {
-        logging.DEBUG: Fore.CYAN + "%(asctime)s | %(levelname)s | %(message)s" + Style.RESET_ALL,
-        logging.INFO: Fore.GREEN + "%(asctime)s | %(levelname)s | %(message)s" + Style.RESET_ALL,
-        logging.WARNING: Fore.YELLOW + "%(asctime)s | %(levelname)s | %(message)s" + Style.RESET_ALL,
-        logging.ERROR: Fore.RED + "%(asctime)s | %(levelname)s | %(message)s" + Style.RESET_ALL,
-        logging.CRITICAL: Fore.RED + Style.BRIGHT + "%(asctime)s | %(levelname)s | %(message)s" + Style.RESET_ALL
+        logging.DEBUG: "\x1b[36m%(asctime)s | %(levelname)s | %(message)s\x1b[0m",
+        logging.INFO: "\x1b[32m%(asctime)s | %(levelname)s | %(message)s\x1b[0m",
+        logging.WARNING: "\x1b[33m%(asctime)s | %(levelname)s | %(message)s\x1b[0m",
+        logging.ERROR: "\x1b[31m%(asctime)s | %(levelname)s | %(message)s\x1b[0m",
+        logging.CRITICAL: "\x1b[1;31m%(asctime)s | %(levelname)s | %(message)s\x1b[0m"
     }
 
+    def __init__(self):
+        super().__init__()
+        # One Formatter per level, built once instead of per record
+        self._formatters = {level: logging.Formatter(fmt, datefmt='%Y-%m-%d | %H:%M:%S')
+                            for level, fmt in self.FORMATS.items()}
+        self._default = logging.Formatter(datefmt='%Y-%m-%d | %H:%M:%S')
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt, datefmt='%Y-%m-%d | %H:%M:%S')
-        return formatter.format(record)
+        return self._formatters.get(record.levelno, self._default).format(record)
+
+class BufferedFileHandler(logging.StreamHandler):
+    """
+    Append-only log file behind a 64KB buffer. Records are not flushed one by
+    one; WARNING and above flush immediately, the rest when the listener idles.
+    """
+    def __init__(self, filename, buffer_size=65536):
+        super().__init__(open(filename, 'a', buffering=buffer_size, encoding='utf-8'))
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.WARNING:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            if self.stream:
+                self.flush()
+                self.stream.close()
+                self.stream = None
+        finally:
+            self.release()
+        super().close()
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that flushes its handlers whenever the queue runs empty"""
+    def dequeue(self, block):
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return super().dequeue(block)
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for an in-process listener. The stock prepare() formats the
+    message (msg % args, traceback text) on the logging thread so the record
+    can be pickled; records here never leave the process, so they are queued
+    as-is and all formatting happens on the listener thread.
+    """
+    def prepare(self, record):
+        return record
 
 def setup_logging(config):
     log_file = config['system']['log_file']
@@ -49,133 +153,431 @@ def setup_logging(config):
     
     # File handler (plain text)
     file_formatter = logging.Formatter('%(asctime)s | %(levelname)s | %(message)s', datefmt='%Y-%m-%d | %H:%M:%S')
-    file_handler = logging.FileHandler(log_file)
+    file_handler = BufferedFileHandler(log_file)
     file_handler.setFormatter(file_formatter)
     
     # Console handler (colored)
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(ColoredFormatter())
+    console_handler.setFormatter(ColoredFormatter() if COLOR_OUTPUT else file_formatter)
+    
+    # Records are only enqueued on the calling thread; formatting and the
+    # file/console writes happen on the listener thread
+    log_queue = queue.Queue(-1)
+    listener = FlushingQueueListener(log_queue, file_handler, console_handler,
+                                     respect_handler_level=True)
     
     logger = logging.getLogger()
     logger.setLevel(config['system'].get('log_level', 'INFO'))
     # Clean existing handlers
     logger.handlers = []
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.addHandler(LocalQueueHandler(log_queue))
+    listener.start()
     
-    return logger
+    return listener
+
+def _next_utc_day(ts):
+    """Epoch seconds of the first UTC midnight after ts"""
+    return (int(ts) // 86400 + 1) * 86400
+
+def _next_utc_week(ts):
+    """Epoch seconds of the first UTC Monday 00:00 after ts (1970-01-01 was a Thursday)"""
+    day = int(ts) // 86400
+    return (day + 7 - (day + 3) % 7) * 86400
+
+def _is_rate_limited(exc):
+    """True if exc (or anything in its cause/context chain) is an HTTP 429"""
+    while exc is not None:
+        if getattr(exc, 'status_code', None) == 429 or '429' in str(exc):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+_EMPTY_ANALYTICS = {
+    'win_rate': 0.0,
+    'avg_trade_size': 0.0,
+    'largest_win': 0.0,
+    'largest_loss': 0.0,
+    'profit_factor': 0.0
+}
+
+# Candidate key names per normalised order field, in priority order
+_ORDER_FIELD_KEYS = {
+    'open': {
+        'side': ('side', 'orderType'),
+        'price': ('limitPx', 'price', 'px'),
+        'size': ('sz', 'size', 'szDecimal'),
+        'coin': ('coin', 'asset'),
+    },
+    'fill': {
+        'side': ('side', 'orderType'),
+        'price': ('price', 'limitPx', 'px'),
+        'size': ('sz', 'size', 'szDecimal'),
+        'pnl': ('closedPnl', 'pnl'),
+        'time': ('time', 'timestamp'),
+    },
+    # Resting orders in user_state, diffed tick to tick by _detect_fills
+    'tracked': {
+        'id': ('oid', 'id'),
+        'side': ('side',),
+        'price': ('limitPx', 'price'),
+        'size': ('sz', 'size'),
+    },
+}
+_ORDER_FIELD_DEFAULTS = {'id': '', 'side': 'UNKNOWN', 'price': 0, 'size': 0, 'pnl': 0, 'time': 0, 'coin': None}
+
+
+@lru_cache(maxsize=4096)
+def _iso_to_ts(s):
+    """
+    Unix time for an ISO-8601 string. The API's 'YYYY-MM-DDTHH:MM:SS[.fff]Z'
+    shape is sliced directly; anything else goes through fromisoformat.
+    Returns 0 for unparseable input.
+    """
+    try:
+        if s[-1] == 'Z' and s[10] == 'T':
+            ts = calendar.timegm((int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                                  int(s[11:13]), int(s[14:16]), int(s[17:19]), 0, 0, 0))
+            return ts + float(s[19:-1]) if s[19] == '.' else float(ts)
+    except (ValueError, IndexError):
+        pass
+    try:
+        return datetime.fromisoformat(s.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return 0
+
+
+def _atomic_write(path, data, durable=False, dir_fd=None):
+    """
+    Truncate a fixed temp file next to path (same filesystem), then rename it
+    over path. With durable=True the data is fsynced before the rename, and
+    the rename itself via dir_fd (the containing directory) if given, so a
+    crash can't leave an empty or zero-filled file behind.
+    """
+    tempname = path + ".tmp"
+    fd = os.open(tempname, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+        if durable:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tempname, path)
+    if durable and dir_fd is not None:
+        os.fsync(dir_fd)
+
+
+def _is_fill(order):
+    """True for a historical order that was (partially) filled"""
+    status = order.get('status')
+    return (isinstance(status, str) and 'fill' in status.lower()) or bool(order.get('filled'))
+
+# Hyperliquid order side codes: 'B' = bid (buy), 'A' = ask (sell)
+_BUY_SIDES = frozenset(('B', 'BUY'))
+
+# CLI text composed once at import; emitted with a single write
+_HELP_BANNER = "\n".join([
+    f"{_YELLOW}=== HyperGridBot Commands ==={_RESET}",
+    f"{_GREEN}/start {_RESET}- Resume trading",
+    f"{_GREEN}/stop  {_RESET}- Pause trading (maintains orders)",
+    f"{_GREEN}/status{_RESET}- Show bot status & PnL",
+    f"{_GREEN}/reload{_RESET}- Reload config from disk",
+    f"{_GREEN}/quit  {_RESET}- Shutdown bot",
+    "",
+])
+
+_STATUS_TEMPLATE = "\n".join([
+    "",
+    f"{_CYAN}=== HyperGridBot Status ==={_RESET}",
+    "Status: {status}" + _RESET,
+    "Mode: {mode}",
+    "Pair: {pair}",
+    "Balance: ${balance:.2f}",
+    "PnL: {pnl_color}${pnl:.2f}" + _RESET,
+    "Active Grids: {grids}",
+    "===========================",
+    "",
+    "",
+])
 
 class HyperGridBot:
+    # Liveness file rewritten every tick; state.json itself only on change
+    HEARTBEAT_FILE = "heartbeat.json"
+    # export_state skips its REST calls and rebuild while price moves less than
+    # this fraction and pnl/orders/trades are unchanged, for at most
+    # STATE_IDLE_MAX seconds
+    STATE_PRICE_EPS = 1e-5
+    STATE_IDLE_MAX = 60
+    # Seconds a meta_and_asset_ctxs() response (universe + funding) is reused
+    META_CTXS_TTL = 60
+    # Seconds past its TTL a cached response is still served while it refreshes in the background
+    STALE_GRACE = 300
+    # Default seconds without a WebSocket push before its data counts as missing
+    # and run() falls back to REST (config: system.ws_stale_after)
+    WS_STALE_AFTER = 30
+    # Seconds to wait on each concurrent REST call (tick snapshot and export_state)
+    IO_TIMEOUT = 5
+    # Retry delay bounds (seconds) after a rate-limited (HTTP 429) tick
+    BACKOFF_MIN = 2
+    BACKOFF_MAX = 30
+
     def __init__(self, config_path, paper_mode=False):
         self.running = True
         self.paused = False
         self.paper_mode = paper_mode
+        self.config_path = config_path
+        self._config_stamp = None   # (path, mtime_ns) of the last parsed config
+        self._config_digest = None  # Hash of the raw config bytes last parsed
         self.load_config(config_path)
         
         # Setup Logger
-        setup_logging(self.config)
+        self.log_listener = setup_logging(self.config)
+        self._check_state_format()
         
         self.setup_sdk()
         self.safety = SafetyMonitor(self.config, self.exchange, self.info, self.address)
+        self.grid_manager = GridManager(self.config, self.exchange)
+        self._build_static_state()
         
         # Grid State
         self.orders = []
-        self.previous_orders = []  # Track previous orders to detect fills
+        self._orders_by_id = {}  # Last tick's open orders by id, diffed to detect fills
         self.current_range_bottom = 0
         self.current_range_top = 0
         
         # Metrics
         self.total_trades = 0
-        self.recent_trades = [] # List of timestamps
-        self.trade_history = []  # List of trade dicts: {timestamp, price, size, side, pnl}
+        self.recent_trades = deque(maxlen=10000) # Fill timestamps, oldest first
+        self.trade_history = TradeHistory()  # Column-wise fills: ts, price, size, is_buy, pnl
+        # Signed size / avg entry of our pair, for realized pnl per fill;
+        # resynced from the exchange position every tick
+        self._pos_size = 0.0
+        self._pos_entry = 0.0
         self.start_balance = 0
+        self._balance_initialized = False  # start_* balances set from the safety monitor
         self.current_balance = 0
         self.start_of_day_balance = 0
         self.start_of_week_balance = 0
-        self.current_day = datetime.utcnow().date()
-        self.current_week = datetime.utcnow().isocalendar()[1]
+        # Epoch seconds of the next UTC day / ISO week (Monday) rollover
+        self._next_day_ts = _next_utc_day(time.time())
+        self._next_week_ts = _next_utc_week(time.time())
         
         # Cached API data (to reduce API calls)
+        self._cache = {}  # key -> (value, fetched_at), see _ttl_cache
+        self._refreshing = set()  # _cache keys with a background refresh in flight
+        self._io_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='api-io')
+        self._backoff = self.BACKOFF_MIN
         self.cached_funding_rate = None
         self.cached_funding_rate_time = 0
         self.cached_meta = None
         self.cached_meta_time = 0
         self.cached_order_history = None
         self.cached_order_history_time = 0
+        self._order_schema = {}  # 'open'/'fill' -> field getters, see _order_getters
+        self._last_user_state = None  # Latest user_state fetched by run()
+        self._universe_idx = {}  # coin name -> index in meta['universe']
+        self._last_meta = None   # meta object _universe_idx was built from
+        self._last_state_hash = None  # Digest of the last state payload written
+        self._last_export_price = 0.0
+        self._last_export_key = None  # (pnl, active orders, total trades, running) at the last full export
+        self._last_export_time = 0.0
+        # Reused across export_state calls; the state is serialized to bytes
+        # before it leaves export_state, so nothing else holds references
+        self._state_data = {}
+        self._positions_buf = []
+        self._open_orders_buf = []
         
         # Register Signal Handler
+        self._shutting_down = False
         signal.signal(signal.SIGINT, self.shutdown)
         signal.signal(signal.SIGTERM, self.shutdown)
 
-        # Start Command Listener
+        # Start Command Listener (stdin is read on its own thread so the
+        # listener can notice self.running going False without a newline)
+        self._cmd_queue = queue.Queue()
+        self._cmd_handlers = {
+            '/help': self._cmd_help,
+            '/commands': self._cmd_help,
+            '/stop': self._cmd_stop,
+            '/start': self._cmd_start,
+            '/status': self._cmd_status,
+            '/reload': self._cmd_reload,
+            '/quit': self._cmd_quit,
+        }
+        self._tick_event = threading.Event()  # set() to wake run() before the 10s tick
+        self.stdin_thread = threading.Thread(target=self._stdin_reader, daemon=True)
+        self.stdin_thread.start()
         self.cmd_thread = threading.Thread(target=self.command_listener, daemon=True)
         self.cmd_thread.start()
+        # Latest (payload, target, heartbeat) for the state writer; only the newest matters
+        self._state_q = queue.Queue(maxsize=1)
+        self._state_stop = threading.Event()  # Writer exits once set and the queue is drained
+        self.state_thread = threading.Thread(target=self._state_writer, name='state-writer', daemon=True)
+        self.state_thread.start()
+
+    def _stdin_reader(self):
+        """
+        Feeds stdin lines into _cmd_queue; None marks EOF. Where stdin is
+        selectable the thread idles on fd readiness and exits with the bot;
+        otherwise (Windows console, regular file) it falls back to readline.
+        """
+        try:
+            fd = sys.stdin.fileno()
+            sel = selectors.DefaultSelector()
+            sel.register(fd, selectors.EVENT_READ)
+        except (AttributeError, ValueError, OSError):
+            for line in iter(sys.stdin.readline, ''):
+                self._cmd_queue.put(line)
+            self._cmd_queue.put(None)
+            return
+        
+        # Read the raw fd so no line is left waiting in a Python-side buffer
+        pending = b''
+        with sel:
+            while self.running:
+                if not sel.select(0.5):
+                    continue
+                chunk = os.read(fd, 4096)
+                if not chunk:
+                    break
+                *lines, pending = (pending + chunk).split(b'\n')
+                for line in lines:
+                    self._cmd_queue.put(line.decode(errors='replace'))
+        if pending:
+            self._cmd_queue.put(pending.decode(errors='replace'))
+        self._cmd_queue.put(None)
 
     def command_listener(self):
         """Listens for CLI commands in a background thread"""
-        print(f"{Fore.CYAN}Interactive CLI Active. Type /help for commands.{Style.RESET_ALL}")
+        print(f"{_CYAN}Interactive CLI Active. Type /help for commands.{_RESET}")
         while self.running:
             try:
-                cmd = input()
+                try:
+                    cmd = self._cmd_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if cmd is None:
+                    break
+                cmd = cmd.strip()
                 if not cmd.startswith("/"):
                     continue
                 
-                cmd = cmd.strip().lower()
-                if cmd == "/help":
-                    print(f"{Fore.YELLOW}=== HyperGridBot Commands ==={Style.RESET_ALL}")
-                    print(f"{Fore.GREEN}/start {Style.RESET_ALL}- Resume trading")
-                    print(f"{Fore.GREEN}/stop  {Style.RESET_ALL}- Pause trading (maintains orders)")
-                    print(f"{Fore.GREEN}/status{Style.RESET_ALL}- Show bot status & PnL")
-                    print(f"{Fore.GREEN}/quit  {Style.RESET_ALL}- Shutdown bot")
-                
-                elif cmd == "/stop":
-                    self.paused = True
-                    logging.warning("Bot PAUSED by user command.")
-                
-                elif cmd == "/start":
-                    self.paused = False
-                    logging.info("Bot RESUMED by user command.")
-                    
-                elif cmd == "/status":
-                    self.print_status()
-                    
-                elif cmd == "/quit":
-                    self.shutdown(None, None)
-                    break
-                    
+                name, *args = cmd.split()
+                handler = self._cmd_handlers.get(name.lower())
+                if handler:
+                    handler(args)
                 else:
-                    print(f"{Fore.RED}Unknown command. Type /help{Style.RESET_ALL}")
-            except EOFError:
-                break
+                    print(f"{_RED}Unknown command. Type /help{_RESET}")
             except Exception as e:
                 logging.error(f"Command error: {e}")
 
+    def _cmd_help(self, args):
+        sys.stdout.write(_HELP_BANNER)
+        sys.stdout.flush()
+
+    def _cmd_stop(self, args):
+        self.paused = True
+        logging.warning("Bot PAUSED by user command.")
+        self._tick_event.set()
+
+    def _cmd_start(self, args):
+        self.paused = False
+        logging.info("Bot RESUMED by user command.")
+        self._tick_event.set()
+
+    def _cmd_status(self, args):
+        self.print_status()
+
+    def _cmd_reload(self, args):
+        if self.reload_config():
+            self._tick_event.set()
+
+    def _cmd_quit(self, args):
+        self.shutdown(None, None)
+
     def print_status(self):
-        print(f"\n{Fore.CYAN}=== HyperGridBot Status ==={Style.RESET_ALL}")
-        print(f"Status: {Fore.RED + 'PAUSED' if self.paused else Fore.GREEN + 'RUNNING'}{Style.RESET_ALL}")
-        print(f"Mode: {'PAPER' if self.paper_mode else 'LIVE'}")
-        print(f"Pair: {self.config.get('grid', {}).get('pair', 'N/A')}")
-        print(f"Balance: ${self.current_balance:.2f}")
-        print(f"PnL: {Fore.GREEN if (self.current_balance - self.start_balance) >= 0 else Fore.RED}${self.current_balance - self.start_balance:.2f}{Style.RESET_ALL}")
-        print(f"Active Grids: {len(self.orders)}")
-        print(f"===========================\n")
+        pnl = self.current_balance - self.start_balance
+        sys.stdout.write(_STATUS_TEMPLATE.format(
+            status=_RED + 'PAUSED' if self.paused else _GREEN + 'RUNNING',
+            mode='PAPER' if self.paper_mode else 'LIVE',
+            pair=self.pair,
+            balance=self.current_balance,
+            pnl_color=_GREEN if pnl >= 0 else _RED,
+            pnl=pnl,
+            grids=len(self.orders),
+        ))
+        sys.stdout.flush()
 
     def load_config(self, path):
-        with open(path, 'r') as f:
-            self.config = json.load(f)
+        """Parse config from disk. Returns False if the file is unchanged since the last load."""
+        stamp = (path, os.stat(path).st_mtime_ns)
+        if stamp == self._config_stamp:
+            return False
+        
+        with open(path, 'rb') as f:
+            raw = f.read()
+        self._config_stamp = stamp
+        # Touched but identical (e.g. save -> reload round trip): keep the parsed config
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+        if digest == self._config_digest:
+            return False
+        self._config_digest = digest
+        self.config = _json_loads(raw)
         
         # Override secret if env var exists
         env_secret = os.getenv("HYPERLIQUID_PRIVATE_KEY")
         if env_secret:
             self.config['wallet']['secret_key'] = env_secret
+        
+        # Hot-path config values resolved once (see update_live_log/export_state)
+        grid_cfg = self.config['grid']
+        self.pair = sys.intern(grid_cfg['pair'])
+        self.n_grids = grid_cfg['grids']
+        self.leverage = grid_cfg['leverage']
+        self.log_file = self.config['system']['log_file']
+        self.state_format = self.config['system'].get('state_format', 'json')
+        self.ws_stale_after = self.config['system'].get('ws_stale_after', self.WS_STALE_AFTER)
+        return True
+
+    def reload_config(self):
+        """Re-read the config file and push it to the safety monitor and grid manager"""
+        pair, leverage = self.pair, self.leverage
+        if not self.load_config(self.config_path):
+            logging.info("Config unchanged, nothing to reload.")
+            return False
+        # Leverage is only applied on the exchange at startup and resting orders
+        # belong to the old pair, so these two need a restart to take effect
+        if (self.pair, self.leverage) != (pair, leverage):
+            logging.error("grid.pair/grid.leverage cannot change on reload (%s %sx -> %s %sx); "
+                          "restart the bot to apply them. Keeping %s %sx.",
+                          pair, leverage, self.pair, self.leverage, pair, leverage)
+            self.pair, self.leverage = pair, leverage
+            self.config['grid']['pair'] = pair
+            self.config['grid']['leverage'] = leverage
+        self._check_state_format()
+        self.safety.update_config(self.config)
+        self.grid_manager.update_config(self.config)
+        self._build_static_state()
+        logging.info("Config reloaded from %s", self.config_path)
+        return True
+
+    def _check_state_format(self):
+        """Fall back to JSON state export when msgpack was requested but is not installed"""
+        if self.state_format == 'msgpack' and msgpack is None:
+            logging.warning("state_format 'msgpack' requested but msgpack is not installed. Using JSON.")
+            self.state_format = 'json'
+
+    def _build_static_state(self):
+        """State export fields that only change with config/mode; copied into each export"""
+        self._static_state = {
+            "mode": "paper" if self.paper_mode else "live",
+            "total_grids": self.n_grids,
+            "leverage": self.leverage,
+            "pair": self.pair,
+        }
 
     def setup_sdk(self):
-        try:
-            from eth_account.account import Account
-            from hyperliquid.info import Info
-            from hyperliquid.exchange import Exchange
-        except ImportError:
-            logging.error("Hyperliquid SDK missing. Please `pip install -r requirements.txt`")
+        if _SDK_IMPORT_ERROR is not None:
+            logging.error("Hyperliquid SDK missing (%s). Please `pip install -r requirements.txt`", _SDK_IMPORT_ERROR)
             sys.exit(1)
 
         secret = self.config['wallet']['secret_key']
@@ -191,7 +593,7 @@ class HyperGridBot:
             self.exchange = None
             return
             
-        account = Account.from_key(secret)
+        account = _account_for(secret)
         self.address = self.config['wallet'].get('account_address') or account.address
         
         base_url = None # Default mainnet
@@ -200,12 +602,135 @@ class HyperGridBot:
              base_url = "https://api.hyperliquid-testnet.xyz"
              logging.info("Initializing in PAPER MODE (using testnet API)")
              
-        self.info = Info(base_url=base_url, skip_ws=True)
+        self.info = Info(base_url=base_url, skip_ws=False)
         self.exchange = Exchange(account, base_url=base_url, account_address=self.address)
+        
+        # Push-based market/user data; run() reads the latest snapshot from memory
+        self._ws_lock = threading.Lock()
+        self._latest_mids = None
+        self._latest_user_state = None
+        self._mids_at = 0.0        # time.monotonic() of the last push of each feed
+        self._user_state_at = 0.0
+        self.info.subscribe({"type": "allMids"}, self._on_mids)
+        self.info.subscribe({"type": "webData2", "user": self.address}, self._on_web_data)
+
+    def _on_mids(self, msg):
+        """WebSocket callback: latest mid prices for all coins"""
+        mids = msg.get('data', {}).get('mids')
+        if mids:
+            with self._ws_lock:
+                self._latest_mids = mids
+                self._mids_at = time.monotonic()
+
+    def _on_web_data(self, msg):
+        """WebSocket callback: clearinghouse state (same shape as info.user_state)"""
+        state = msg.get('data', {}).get('clearinghouseState')
+        if state:
+            with self._ws_lock:
+                self._latest_user_state = state
+                self._user_state_at = time.monotonic()
+
+    def _read_snapshot(self):
+        """
+        Latest (user_state, all_mids) from WebSocket. A feed with no push yet,
+        or none for ws_stale_after seconds (stalled socket), is fetched over REST.
+        """
+        cutoff = time.monotonic() - self.ws_stale_after
+        with self._ws_lock:
+            user_state, user_at = self._latest_user_state, self._user_state_at
+            all_mids, mids_at = self._latest_mids, self._mids_at
+        if (user_state is not None and user_at <= cutoff) or (all_mids is not None and mids_at <= cutoff):
+            logging.warning("WebSocket data stale (>%ss); falling back to REST", self.ws_stale_after)
+        if user_at <= cutoff:
+            user_state = None
+        if mids_at <= cutoff:
+            all_mids = None
+        # Missing feeds (startup, WebSocket gap) are fetched concurrently
+        fut_user = fut_mids = None
+        if user_state is None:
+            fut_user = self._io_pool.submit(self.info.user_state, self.address)
+        if all_mids is None:
+            fut_mids = self._io_pool.submit(self.info.all_mids)
+        # A hung request fails this tick into run()'s error path instead of blocking the loop
+        if fut_user is not None:
+            user_state = fut_user.result(timeout=self.IO_TIMEOUT)
+        if fut_mids is not None:
+            all_mids = fut_mids.result(timeout=self.IO_TIMEOUT)
+        return user_state, all_mids
+
+    def _snapshot_tick(self):
+        """
+        Everything run() needs for one tick, fetched once: user_state and mids
+        (WebSocket), meta/asset contexts (TTL cache), our mid price and positions
+        keyed by coin. meta/ctxs are None if the metadata request failed.
+        """
+        user_state, all_mids = self._read_snapshot()
+        try:
+            meta, ctxs = self._ttl_cache('meta_ctxs', self.META_CTXS_TTL,
+                                         self.info.meta_and_asset_ctxs)
+        except Exception as e:
+            logging.warning("Could not fetch market metadata: %s", e)
+            meta, ctxs = None, None
+        
+        return {
+            'user_state': user_state,
+            'mids': all_mids,
+            'meta': meta,
+            'ctxs': ctxs,
+            'price': float(all_mids.get(self.pair, 0)),
+            'positions': {ap['position']['coin']: ap['position']
+                          for ap in user_state.get('assetPositions', ())},
+        }
+
+    def _resolve_coin_idx(self, meta):
+        """Index of our pair in meta['universe'], via a name index rebuilt only when the meta cache refreshes"""
+        if meta is not None and meta is not self._last_meta:
+            self._universe_idx = {c['name']: i for i, c in enumerate(meta['universe'])}
+            self._last_meta = meta
+        return self._universe_idx.get(self.pair, -1)
+
+    def _pair_ctx(self, meta, asset_ctxs):
+        """Our pair's entry in asset_ctxs (parallel to meta['universe']), or None"""
+        coin_idx = self._resolve_coin_idx(meta)
+        if asset_ctxs and 0 <= coin_idx < len(asset_ctxs):
+            return asset_ctxs[coin_idx]
+        return None
+
+    def _ttl_cache(self, key, ttl, fn, allow_stale=True):
+        """
+        Return fn() memoized under key for ttl seconds. Once expired, the last
+        value keeps being served for up to STALE_GRACE seconds while a single
+        refresh runs on _io_pool (stale-while-revalidate), so the trading loop
+        doesn't wait on the API for a key it has already seen. Beyond that, or
+        with allow_stale=False, fn() is called inline and its errors propagate.
+        """
+        now = time.time()
+        entry = self._cache.get(key)
+        if entry is not None:
+            age = now - entry[1]
+            if age < ttl:
+                return entry[0]
+            if allow_stale and age < ttl + self.STALE_GRACE:
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._io_pool.submit(self._refresh_cache, key, fn)
+                return entry[0]
+        value = fn()
+        self._cache[key] = (value, time.time())
+        return value
+
+    def _refresh_cache(self, key, fn):
+        """Background half of _ttl_cache; a failure leaves the stale entry in place"""
+        try:
+            self._cache[key] = (fn(), time.time())
+        except Exception as e:
+            logging.warning("Background refresh of %s failed: %s", key, e)
+        finally:
+            self._refreshing.discard(key)
 
     def update_live_log(self, pnl, current_price, active_grids):
-        msg = f"PnL: ${pnl:+.2f} | {self.config['grid']['pair']} {current_price:.2f} | {active_grids}/{self.config['grid']['grids']} active grids"
-        logging.info(msg)
+        logging.info("PnL: $%+.2f | %s %.2f | %d/%d active grids",
+                     pnl, self.pair, current_price, active_grids, self.n_grids)
 
     def run(self):
         logging.info("Starting HyperGridBot...")
@@ -215,8 +740,11 @@ class HyperGridBot:
 
         while self.running:
             try:
-                # Sync loop frequency
-                time.sleep(10) # 10s tick
+                # Sync loop frequency: 10s tick, or sooner if a command wakes us
+                self._tick_event.wait(10)
+                self._tick_event.clear()
+                if not self.running:
+                    break
 
                 if self.paused:
                     continue
@@ -226,11 +754,16 @@ class HyperGridBot:
                     logging.warning("SDK not initialized (Key missing?). Sleeping.")
                     continue
 
-                # Fetch User State & Market Data
-                user_state = self.info.user_state(self.address)
-                logging.debug(f"User state response: {user_state}")
+                # One coherent snapshot per tick; everything below reads from it
+                snap = self._snapshot_tick()
+                user_state = snap['user_state']
+                positions_by_coin = snap['positions']
+                self._last_user_state = user_state
                 margin_summary = user_state.get('marginSummary', {})
-                logging.debug(f"Margin summary: {margin_summary}")
+                # user_state is large; don't repr() it unless DEBUG is on
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                    logging.debug("User state response: %s", user_state)
+                    logging.debug("Margin summary: %s", margin_summary)
                 
                 # Get account value - in Hyperliquid, accountValue represents total account value
                 # When no positions: accountValue = totalRawUsd (available USDC)
@@ -243,16 +776,16 @@ class HyperGridBot:
                 if account_value == 0:
                     if total_raw_usd > 0:
                         account_value = total_raw_usd
-                        logging.info(f"Using totalRawUsd as account value: ${account_value:.2f}")
+                        logging.info("Using totalRawUsd as account value: $%.2f", account_value)
                     elif withdrawable > 0:
                         account_value = withdrawable
-                        logging.info(f"Using withdrawable as account value: ${account_value:.2f}")
+                        logging.info("Using withdrawable as account value: $%.2f", account_value)
                 
-                logging.info(f"Detected account value: ${account_value:.2f} USDC (rawUsd: ${total_raw_usd:.2f}, withdrawable: ${withdrawable:.2f})")
+                logging.info("Detected account value: $%.2f USDC (rawUsd: $%.2f, withdrawable: $%.2f)",
+                             account_value, total_raw_usd, withdrawable)
                 
-                # Fetch Price
-                all_mids = self.info.all_mids()
-                price = float(all_mids.get(self.config['grid']['pair'], 0))
+                # Price
+                price = snap['price']
                 
                 if price == 0:
                     logging.warning("Could not fetch price. Retrying...")
@@ -267,44 +800,44 @@ class HyperGridBot:
                     continue
                 
                 # 2. Market Conditions (Funding)
-                # Fetch detailed market state
+                meta, asset_ctxs = snap['meta'], snap['ctxs']
                 try:
-                    meta_and_asset_ctxs = self.info.meta_and_asset_ctxs()
-                    # Find our coin index/state
-                    # Structure: [meta, asset_ctxs]
-                    meta, asset_ctxs = meta_and_asset_ctxs
-                    universe = meta['universe']
-                    # Find coin index
-                    coin_idx = next((i for i, c in enumerate(universe) if c['name'] == self.config['grid']['pair']), -1)
+                    now = time.time()
+                    ctx = self._pair_ctx(meta, asset_ctxs)
                     
-                    if coin_idx != -1:
-                        ctx = asset_ctxs[coin_idx]
+                    if ctx is not None:
                         funding_rate = float(ctx.get('funding', 0.0))
+                        self.cached_funding_rate = funding_rate
+                        self.cached_funding_rate_time = now
                         
                         # Get current position size to determine 'adverse'
-                        pos_size = 0
-                        for p in user_state.get('assetPositions', []):
-                            if p['position']['coin'] == self.config['grid']['pair']:
-                                pos_size = float(p['position']['szi'])
-                                break
+                        own_pos = positions_by_coin.get(self.pair)
+                        pos_size = float(own_pos['szi']) if own_pos else 0
                         
                         if not self.safety.check_funding_rate(funding_rate, pos_size):
-                             logging.warning(f"Adverse Funding Rate detected ({funding_rate:.5f}). Pausing grid.")
+                             logging.warning("Adverse Funding Rate detected (%.5f). Pausing grid.", funding_rate)
                              continue
                 except Exception as e:
-                    logging.warning(f"Could not check funding rate: {e}")
+                    logging.warning("Could not check funding rate: %s", e)
 
                 # Trend Break Check
                 if self.current_range_bottom > 0 and price < (self.current_range_bottom * 0.95):
-                    logging.warning(f"Trend Break! Price {price} < {self.current_range_bottom} * 0.95. Selling inventory.")
+                    logging.warning("Trend Break! Price %s < %s * 0.95. Selling inventory.", price, self.current_range_bottom)
                     self.safety.emergency_exit()
                     break
 
                 # Grid Logic
                 self.manage_grids(price, user_state)
+                own_pos = positions_by_coin.get(self.pair)
+                if own_pos:
+                    self._pos_size = float(own_pos.get('szi', 0) or 0)
+                    self._pos_entry = float(own_pos.get('entryPx', 0) or 0)
+                else:
+                    self._pos_size = self._pos_entry = 0.0
                 
                 # Update Metrics
-                if self.start_balance == 0 and self.safety.initial_account_value:
+                if not self._balance_initialized and self.safety.initial_account_value:
+                    self._balance_initialized = True
                     self.start_balance = self.safety.initial_account_value
                     self.start_of_day_balance = self.start_balance
                     self.start_of_week_balance = self.start_balance
@@ -314,85 +847,130 @@ class HyperGridBot:
                 active_orders = len(self.orders)
                 self.update_live_log(pnl, price, active_orders)
                 
-                # Export State for UI - pass user_state to avoid re-fetching
-                self.export_state(pnl, price, active_orders, user_state)
+                # Export State for UI - reuses this tick's user_state (no second fetch)
+                self.export_state(pnl, price, active_orders, user_state, positions_by_coin)
+                
+                # Decay the rate-limit backoff after a clean tick
+                self._backoff = max(self.BACKOFF_MIN, self._backoff // 2)
 
             except Exception as e:
-                logging.error(f"Error in main loop: {e}", exc_info=True)
+                if _is_rate_limited(e):
+                    logging.warning("Rate limited by API. Backing off %ss.", self._backoff)
+                    time.sleep(self._backoff)
+                    self._backoff = min(self.BACKOFF_MAX, self._backoff * 2)
+                    continue
+                logging.error("Error in main loop: %s", e, exc_info=True)
                 time.sleep(5)
 
-    def _detect_fills(self, previous_orders, current_orders, current_price):
-        """Detect order fills by comparing previous and current open orders"""
+    def _order_getters(self, kind, sample):
+        """
+        Field -> getter for an order payload of the given kind ('open'/'fill'),
+        resolved once from the first order seen. The API format is stable, so
+        each getter is a prebound order.get(key, default) with no key probing.
+        A None key (field absent) makes the getter return its default.
+        """
+        getters = self._order_schema.get(kind)
+        if getters is None:
+            getters = self._order_schema[kind] = {
+                field: methodcaller('get', next((k for k in candidates if k in sample), None),
+                                    _ORDER_FIELD_DEFAULTS[field])
+                for field, candidates in _ORDER_FIELD_KEYS[kind].items()
+            }
+        return getters
+
+    def _expire_trades(self, now):
+        """Drop fills older than 24h from the heads of recent_trades and trade_history"""
+        cutoff = now - 86400
+        recent = self.recent_trades
+        while recent and recent[0] < cutoff:
+            recent.popleft()
+        self.trade_history.expire(cutoff)
+
+    def _detect_fills(self, current_orders, current_price):
+        """
+        Detect order fills by diffing current open orders against the previous
+        tick's. The current orders are keyed by id once and that dict becomes
+        next tick's baseline, so each tick builds a single index.
+        """
+        prev_by_id = self._orders_by_id
+        curr_by_id = {}
         try:
-            if not previous_orders:
+            if not current_orders and not prev_by_id:
                 return
             
-            # Create sets of order IDs for comparison
-            prev_order_ids = {order.get('oid', order.get('id', '')) for order in previous_orders}
-            curr_order_ids = {order.get('oid', order.get('id', '')) for order in current_orders}
+            sample = current_orders[0] if current_orders else next(iter(prev_by_id.values()))
+            g = self._order_getters('tracked', sample)
+            get_id, get_side, get_price, get_size = g['id'], g['side'], g['price'], g['size']
             
-            # Find filled orders (in previous but not in current)
-            filled_order_ids = prev_order_ids - curr_order_ids
+            curr_by_id = {get_id(order): order for order in current_orders}
+            # Fills are ids that disappeared
+            filled_order_ids = prev_by_id.keys() - curr_by_id.keys()
             
             if filled_order_ids:
-                # Find the filled order details
-                for order in previous_orders:
-                    order_id = order.get('oid', order.get('id', ''))
-                    if order_id in filled_order_ids:
-                        # Record the fill
-                        now = time.time()
-                        self.total_trades += 1
-                        self.recent_trades.append(now)
-                        
-                        # Extract order details
-                        side = "BUY" if order.get('side') == 'B' or order.get('side') == 'A' else "SELL"
-                        price = float(order.get('limitPx', order.get('price', current_price)))
-                        size = float(order.get('sz', order.get('size', 0)))
-                        
-                        # Store trade history
-                        self.trade_history.append({
-                            'timestamp': now,
-                            'price': price,
-                            'size': size,
-                            'side': side,
-                            'pnl': 0.0  # Will be calculated when position closes
-                        })
-                        
-                        logging.info(f"Order filled: {side} {size} @ ${price:.2f}")
+                now = time.time()
+                self._expire_trades(now)
+                for order_id in filled_order_ids:
+                    order = prev_by_id[order_id]
+                    # Record the fill
+                    self.total_trades += 1
+                    self.recent_trades.append(now)
+                    
+                    # Extract order details
+                    side = "BUY" if get_side(order) in _BUY_SIDES else "SELL"
+                    price = float(get_price(order) or current_price)
+                    size = float(get_size(order))
+                    
+                    # Store trade history with the pnl realized if this fill reduced the position
+                    is_buy = side == "BUY"
+                    self.trade_history.append(now, price, size, is_buy,
+                                              self._apply_fill(is_buy, price, size))
+                    
+                    logging.info("Order filled: %s %s @ $%.2f", side, size, price)
                         
         except Exception as e:
-            logging.error(f"Error detecting fills: {e}")
+            logging.error("Error detecting fills: %s", e)
+        finally:
+            self._orders_by_id = curr_by_id
+
+    def _apply_fill(self, is_buy, price, size):
+        """Move the tracked position by one fill; returns the pnl it realized"""
+        pos, entry = self._pos_size, self._pos_entry
+        qty = size if is_buy else -size
+        pnl = 0.0
+        if pos and (pos > 0) != is_buy:
+            closed = min(size, abs(pos))
+            pnl = closed * (price - entry) if pos > 0 else closed * (entry - price)
+        new_pos = pos + qty
+        if not new_pos:
+            entry = 0.0
+        elif not pos or (pos > 0) != (new_pos > 0):
+            entry = price  # Opened, or flipped through flat
+        elif (pos > 0) == is_buy:
+            entry = (entry * abs(pos) + price * size) / abs(new_pos)
+        self._pos_size, self._pos_entry = new_pos, entry
+        return pnl
 
     def _calculate_trade_analytics(self):
         """Calculate trade analytics from trade history"""
         try:
-            now = time.time()
-            trades_24h = [t for t in self.trade_history if now - t['timestamp'] < 86400]
-            
-            if not trades_24h:
-                return {
-                    'win_rate': 0.0,
-                    'avg_trade_size': 0.0,
-                    'largest_win': 0.0,
-                    'largest_loss': 0.0,
-                    'profit_factor': 0.0
-                }
+            # Aggregates are maintained incrementally by TradeHistory; only
+            # rows aging out of the 24h window cost anything here
+            history = self.trade_history
+            history.expire(time.time() - 86400)
+            count = len(history)
             
-            # Calculate win rate from closed positions (for now, use all trades)
-            # In future, we'd track realized PnL per trade
-            wins = [t for t in trades_24h if t.get('pnl', 0) > 0]
-            losses = [t for t in trades_24h if t.get('pnl', 0) < 0]
+            if not count:
+                return dict(_EMPTY_ANALYTICS)
             
-            win_rate = (len(wins) / len(trades_24h) * 100) if trades_24h else 0.0
-            avg_trade_size = sum(t['size'] for t in trades_24h) / len(trades_24h) if trades_24h else 0.0
+            # Win rate over all fills; only position-reducing fills carry pnl
+            total_wins = history.sum_win
+            total_losses = history.sum_loss
             
-            pnls = [t.get('pnl', 0) for t in trades_24h]
-            largest_win = max(pnls) if pnls and max(pnls) > 0 else 0.0
-            largest_loss = min(pnls) if pnls and min(pnls) < 0 else 0.0
-            
-            total_wins = sum(t.get('pnl', 0) for t in wins) if wins else 0.0
-            total_losses = abs(sum(t.get('pnl', 0) for t in losses)) if losses else 0.0
-            profit_factor = (total_wins / total_losses) if total_losses > 0 else (total_wins if total_wins > 0 else 0.0)
+            win_rate = history.wins / count * 100
+            avg_trade_size = history.sum_size / count
+            largest_win = history.largest_win
+            largest_loss = history.largest_loss
+            profit_factor = (total_wins / total_losses) if total_losses > 0 else total_wins
             
             return {
                 'win_rate': win_rate,
@@ -402,48 +980,49 @@ class HyperGridBot:
                 'profit_factor': profit_factor
             }
         except Exception as e:
-            logging.error(f"Error calculating trade analytics: {e}")
-            return {
-                'win_rate': 0.0,
-                'avg_trade_size': 0.0,
-                'largest_win': 0.0,
-                'largest_loss': 0.0,
-                'profit_factor': 0.0
-            }
+            logging.error("Error calculating trade analytics: %s", e)
+            return dict(_EMPTY_ANALYTICS)
 
-    def export_state(self, pnl, current_price, active_orders, user_state=None):
-        """Export bot state to JSON for Dashboard"""
+    def export_state(self, pnl, current_price, active_orders, user_state, positions_by_coin):
+        """Export bot state to JSON for Dashboard (user_state comes from the run() tick)"""
         try:
             now = time.time()
             
-            # Use provided user_state or fetch if not provided
-            if user_state is None and self.info:
-                try:
-                    user_state = self.info.user_state(self.address)
-                except Exception as e:
-                    logging.error(f"Failed to fetch user_state in export_state: {e}")
-                    user_state = {}
+            # Idle tick: nothing material moved since the last full export
+            key = (pnl, active_orders, self.total_trades, self.running)
+            if (key == self._last_export_key
+                    and abs(current_price - self._last_export_price) <= self.STATE_PRICE_EPS * current_price
+                    and now - self._last_export_time < self.STATE_IDLE_MAX):
+                self._queue_state_write(now)
+                return
+            self._last_export_key = key
+            self._last_export_price = current_price
+            self._last_export_time = now
             
             # Clean old trades (>24h)
-            self.recent_trades = [t for t in self.recent_trades if now - t < 86400]
-            self.trade_history = [t for t in self.trade_history if now - t['timestamp'] < 86400]
+            self._expire_trades(now)
             
-            # Update daily/weekly tracking
-            current_date = datetime.utcnow().date()
-            current_week = datetime.utcnow().isocalendar()[1]
-            
-            if current_date != self.current_day:
+            # Update daily/weekly tracking (plain float compare until a boundary passes)
+            if now >= self._next_day_ts:
                 self.start_of_day_balance = self.current_balance
-                self.current_day = current_date
+                self._next_day_ts = _next_utc_day(now)
             
-            if current_week != self.current_week:
+            if now >= self._next_week_ts:
                 self.start_of_week_balance = self.current_balance
-                self.current_week = current_week
+                self._next_week_ts = _next_utc_week(now)
             
             # Calculate daily and weekly PnL
             pnl_daily = self.current_balance - self.start_of_day_balance if self.start_of_day_balance > 0 else 0
             pnl_weekly = self.current_balance - self.start_of_week_balance if self.start_of_week_balance > 0 else 0
             
+            # Start the export's REST calls concurrently; results are collected below
+            history_stale = now - self.cached_order_history_time > 60 or self.cached_order_history is None
+            fut_history = fut_open = None
+            if self.info:
+                if history_stale:
+                    fut_history = self._io_pool.submit(self.info.historical_orders, self.address)
+                fut_open = self._io_pool.submit(self.info.open_orders, self.address)
+            
             # Get margin info from user_state
             margin_summary = user_state.get('marginSummary', {}) if user_state else {}
             margin_used = float(margin_summary.get('totalMarginUsed', 0))
@@ -451,129 +1030,126 @@ class HyperGridBot:
             available_balance = float(user_state.get('withdrawable', 0)) if user_state else 0
             margin_ratio = (account_value / margin_used) if margin_used > 0 else 0
             
-            # Get funding rate (cached, update every 5 minutes)
+            # Get funding rate (refreshed by run() from the shared meta_ctxs cache)
             funding_rate = 0.0
             funding_rate_24h_avg = 0.0
             try:
-                if self.info and (now - self.cached_funding_rate_time > 300 or self.cached_funding_rate is None):
-                    meta_and_asset_ctxs = self.info.meta_and_asset_ctxs()
-                    meta, asset_ctxs = meta_and_asset_ctxs
-                    universe = meta['universe']
-                    coin_idx = next((i for i, c in enumerate(universe) if c['name'] == self.config['grid']['pair']), -1)
-                    if coin_idx != -1:
-                        ctx = asset_ctxs[coin_idx]
+                if self.info and now - self.cached_funding_rate_time > self.META_CTXS_TTL:
+                    meta, asset_ctxs = self._ttl_cache('meta_ctxs', self.META_CTXS_TTL,
+                                                       self.info.meta_and_asset_ctxs)
+                    ctx = self._pair_ctx(meta, asset_ctxs)
+                    if ctx is not None:
                         funding_rate = float(ctx.get('funding', 0.0))
                         self.cached_funding_rate = funding_rate
                         self.cached_funding_rate_time = now
                 else:
                     funding_rate = self.cached_funding_rate or 0.0
             except Exception as e:
-                logging.debug(f"Could not fetch funding rate: {e}")
+                logging.debug("Could not fetch funding rate: %s", e)
                 funding_rate = self.cached_funding_rate or 0.0
             
             # Get order history (cached, update every minute)
             recent_fills = []
             try:
-                if self.info and (now - self.cached_order_history_time > 60 or self.cached_order_history is None):
+                if fut_history is not None:
                     # Get recent fills from historical orders
                     # Note: historical_orders may need different parameters - wrap in try/except
                     try:
-                        hist_orders = self.info.historical_orders(self.address)
+                        hist_orders = fut_history.result(timeout=self.IO_TIMEOUT)
                         if hist_orders and isinstance(hist_orders, list):
                             # Filter for fills in last 24h
+                            g = self._order_getters('fill', hist_orders[0])
+                            get_side, get_price, get_size, get_pnl, get_time = (
+                                g['side'], g['price'], g['size'], g['pnl'], g['time'])
                             recent_fills = []
                             for order in hist_orders:
-                                # Handle different possible order formats
-                                status = order.get('status', '').lower() if isinstance(order.get('status'), str) else ''
-                                if 'fill' in status or order.get('filled'):
-                                    fill_time = order.get('time', order.get('timestamp', 0))
+                                if _is_fill(order):
+                                    fill_time = get_time(order)
                                     # Convert to unix timestamp if needed
                                     if isinstance(fill_time, str):
-                                        try:
-                                            fill_time = datetime.fromisoformat(fill_time.replace('Z', '+00:00')).timestamp()
-                                        except:
-                                            fill_time = 0
+                                        fill_time = _iso_to_ts(fill_time)
                                     
                                     if fill_time > 0 and now - fill_time < 86400:  # Last 24h
                                         recent_fills.append({
                                             'timestamp': fill_time,
-                                            'side': order.get('side', order.get('orderType', 'UNKNOWN')),
-                                            'price': float(order.get('price', order.get('limitPx', order.get('px', 0)))),
-                                            'size': float(order.get('sz', order.get('size', order.get('szDecimal', 0)))),
-                                            'pnl': float(order.get('closedPnl', order.get('pnl', 0)))
+                                            'side': get_side(order),
+                                            'price': float(get_price(order)),
+                                            'size': float(get_size(order)),
+                                            'pnl': float(get_pnl(order))
                                         })
                             self.cached_order_history = recent_fills
                             self.cached_order_history_time = now
                     except Exception as e:
-                        logging.debug(f"historical_orders API call failed: {e}")
+                        logging.debug("historical_orders API call failed: %s", e)
                         recent_fills = self.cached_order_history or []
                 else:
                     recent_fills = self.cached_order_history or []
             except Exception as e:
-                logging.debug(f"Could not fetch order history: {e}")
+                logging.debug("Could not fetch order history: %s", e)
                 recent_fills = self.cached_order_history or []
             
             # Get open orders details
-            open_orders_detail = []
+            open_orders_detail = self._open_orders_buf
+            open_orders_detail.clear()
             try:
-                if self.info:
-                    open_orders = self.info.open_orders(self.address)
+                if fut_open is not None:
+                    open_orders = fut_open.result(timeout=self.IO_TIMEOUT)
                     if open_orders and isinstance(open_orders, list):
-                        for order in open_orders:
-                            # Handle different possible order formats
-                            open_orders_detail.append({
-                                'side': order.get('side', order.get('orderType', 'UNKNOWN')),
-                                'price': float(order.get('limitPx', order.get('price', order.get('px', 0)))),
-                                'size': float(order.get('sz', order.get('size', order.get('szDecimal', 0)))),
-                                'coin': order.get('coin', order.get('asset', self.config['grid']['pair']))
-                            })
+                        g = self._order_getters('open', open_orders[0])
+                        get_side, get_price, get_size, get_coin = g['side'], g['price'], g['size'], g['coin']
+                        pair = self.pair
+                        open_orders_detail.extend({
+                            'side': get_side(order),
+                            'price': float(get_price(order)),
+                            'size': float(get_size(order)),
+                            'coin': get_coin(order) or pair
+                        } for order in open_orders)
             except Exception as e:
-                logging.debug(f"Could not fetch open orders: {e}")
+                logging.debug("Could not fetch open orders: %s", e)
             
-            # Fetch and enhance positions
-            positions = []
+            # Fetch and enhance positions (single pass, flat positions skipped early)
+            positions = self._positions_buf
+            positions.clear()
+            total_upnl = 0.0
             try:
-                if user_state:
-                    for asset_pos in user_state.get("assetPositions", []):
-                        pos = asset_pos.get("position", {})
-                        coin = pos.get("coin", "")
-                        size = float(pos.get("szi", 0))
-                        entry = float(pos.get("entryPx", 0))
-                        u_pnl = float(pos.get("unrealizedPnl", 0))
-                        liq_px = float(pos.get("liquidationPx", 0))
-                        margin_used_pos = float(pos.get("marginUsed", 0))
-                        
-                        if size != 0:
-                            # Calculate ROI
-                            roi = (u_pnl / (entry * abs(size))) * 100 if entry > 0 and size != 0 else 0
-                            
-                            positions.append({
-                                "symbol": coin,
-                                "side": "LONG" if size > 0 else "SHORT",
-                                "size": abs(size),
-                                "entry_price": entry,
-                                "mark_price": current_price if coin == self.config['grid']['pair'] else 0,
-                                "liquidation_price": liq_px,
-                                "margin_used": margin_used_pos,
-                                "unrealized_pnl": u_pnl,
-                                "roi_pct": roi,
-                                "leverage": self.config['grid']['leverage']
-                            })
+                pair, leverage = self.pair, self.leverage
+                for coin, pos in positions_by_coin.items():
+                    size = float(pos.get("szi", 0) or 0)
+                    if not size:
+                        continue
+                    
+                    abs_size = size if size > 0 else -size
+                    entry = float(pos.get("entryPx", 0) or 0)
+                    u_pnl = float(pos.get("unrealizedPnl", 0) or 0)
+                    total_upnl += u_pnl
+                    
+                    positions.append({
+                        "symbol": coin,
+                        "side": "LONG" if size > 0 else "SHORT",
+                        "size": abs_size,
+                        "entry_price": entry,
+                        "mark_price": current_price if coin == pair else 0,
+                        "liquidation_price": float(pos.get("liquidationPx", 0) or 0),
+                        "margin_used": float(pos.get("marginUsed", 0) or 0),
+                        "unrealized_pnl": u_pnl,
+                        "roi_pct": (u_pnl / (entry * abs_size)) * 100 if entry > 0 else 0,
+                        "leverage": leverage
+                    })
             except Exception as e:
-                logging.error(f"Failed to fetch positions for export: {e}")
+                logging.error("Failed to fetch positions for export: %s", e)
             
             # Calculate trade analytics
             trade_analytics = self._calculate_trade_analytics()
             
             # Calculate grid efficiency
-            grid_efficiency = (active_orders / self.config['grid']['grids'] * 100) if self.config['grid']['grids'] > 0 else 0
+            grid_efficiency = (active_orders / self.n_grids * 100) if self.n_grids > 0 else 0
             
             # Build comprehensive state data
-            state_data = {
+            state_data = self._state_data
+            state_data.clear()
+            state_data.update(self._static_state)
+            state_data.update({
                 "status": "running" if self.running else "stopped",
-                "mode": "paper" if self.paper_mode else "live",
-                "updated_at": datetime.utcnow().isoformat(),
-                "timestamp": now,
                 
                 # Balance & Account Info
                 "balance": self.current_balance,
@@ -588,6 +1164,7 @@ class HyperGridBot:
                 "pnl_pct": (pnl / self.start_balance * 100) if self.start_balance > 0 else 0,
                 "pnl_daily": pnl_daily,
                 "pnl_weekly": pnl_weekly,
+                "unrealized_pnl": total_upnl,
                 
                 # Market Data
                 "price": current_price,
@@ -605,7 +1182,6 @@ class HyperGridBot:
                 
                 # Grid Info
                 "active_grids": active_orders,
-                "total_grids": self.config['grid']['grids'],
                 "grid_efficiency": grid_efficiency,
                 "grid_range": {
                     "low": self.current_range_bottom,
@@ -616,27 +1192,79 @@ class HyperGridBot:
                 "positions": positions,
                 "open_orders": open_orders_detail,
                 "recent_fills": recent_fills,
-                
-                # Config
-                "leverage": self.config['grid']['leverage'],
-                "pair": self.config['grid']['pair']
-            }
+            })
+            
+            if self.state_format == 'msgpack':
+                payload, target = msgpack.packb(state_data), "state.msgpack"
+            else:
+                payload, target = _json_dumps(state_data), "state.json"
             
-            # Atomic write
-            with tempfile.NamedTemporaryFile('w', delete=False, dir=os.path.dirname(self.config['system']['log_file'])) as tf:
-                json.dump(state_data, tf)
-                tempname = tf.name
+            # Timestamps live in the heartbeat file, so identical payload bytes
+            # mean nothing changed: skip the state write and only beat
+            digest = hashlib.blake2b(payload, digest_size=16).digest()
+            if digest == self._last_state_hash:
+                self._queue_state_write(now)
+                return
+            self._last_state_hash = digest
             
-            shutil.move(tempname, "state.json")
+            self._queue_state_write(now, payload, target)
             
         except Exception as e:
-            logging.error(f"Failed to export state: {e}", exc_info=True)
+            logging.error("Failed to export state: %s", e, exc_info=True)
+
+    def _queue_state_write(self, now, payload=None, target=None):
+        """
+        Hand a heartbeat, plus a new state payload if given, to the writer
+        thread. A snapshot it hasn't picked up yet is replaced, but its state
+        payload is carried over when this call only brings a heartbeat.
+        """
+        if not self.running:
+            return  # Shutting down; the writer is draining its last item
+        heartbeat = _json_dumps({"updated_at": datetime.utcfromtimestamp(now).isoformat(), "timestamp": now})
+        try:
+            pending = self._state_q.get_nowait()
+        except queue.Empty:
+            pending = None
+        if payload is None and pending is not None:
+            payload, target = pending[0], pending[1]
+        self._state_q.put_nowait((payload, target, heartbeat))
+
+    def _state_writer(self):
+        """Writes queued state snapshots off the trading loop until _state_stop is set"""
+        # The state files live in the working directory; hold it open once so
+        # each durable write can fsync the rename (POSIX only)
+        dir_fd = None
+        if hasattr(os, 'O_DIRECTORY'):
+            try:
+                dir_fd = os.open('.', os.O_RDONLY | os.O_DIRECTORY)
+            except OSError:
+                pass
+        try:
+            while True:
+                try:
+                    item = self._state_q.get(timeout=0.5)
+                except queue.Empty:
+                    if self._state_stop.is_set():
+                        break
+                    continue
+                payload, target, heartbeat = item
+                try:
+                    # The state is fsynced; the heartbeat is rewritten every tick
+                    # and losing one on a crash costs nothing
+                    if payload is not None:
+                        _atomic_write(target, payload, durable=True, dir_fd=dir_fd)
+                    _atomic_write(self.HEARTBEAT_FILE, heartbeat)
+                except Exception as e:
+                    logging.error("Failed to write state: %s", e)
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
 
     def set_leverage(self):
         try:
-            logging.info(f"Setting leverage to {self.config['grid']['leverage']}x Isolated on {self.config['grid']['pair']}")
+            logging.info(f"Setting leverage to {self.leverage}x Isolated on {self.pair}")
             if self.exchange:
-                self.exchange.update_leverage(self.config['grid']['leverage'], self.config['grid']['pair'], False)
+                self.exchange.update_leverage(self.leverage, self.pair, False)
         except Exception as e:
             logging.error(f"Failed to set leverage: {e}")
 
@@ -649,26 +1277,16 @@ class HyperGridBot:
             open_orders = user_state.get('openOrders', [])
             
             # Detect fills by comparing previous orders with current orders
-            self._detect_fills(self.previous_orders, open_orders, current_price)
-            
-            self.previous_orders = open_orders.copy() if open_orders else []
+            self._detect_fills(open_orders, current_price)
             self.orders = open_orders # Sync state
             
             if not open_orders:
-                logging.info(f"No active orders. Initializing grid at {current_price}")
-                # Initialize GridManager if not exists or just use instance
-                # We should instantiate GridManager in __init__, but for now we do it here or assume self.grid_manager exists
-                # Let's assume we added it to __init__, or lazily init here.
-                # To be clean, I will update __init__ in a separate chunk or just init here.
-                from src.grid import GridManager 
-                if not hasattr(self, 'grid_manager'):
-                    self.grid_manager = GridManager(self.config, self.exchange)
-
+                logging.info("No active orders. Initializing grid at %s", current_price)
                 new_orders = self.grid_manager.place_initial_orders(current_price)
                 
                 # Place orders
                 results = self.exchange.bulk_orders(new_orders)
-                logging.info(f"Orders placed. Result: {results}")
+                logging.info("Orders placed. Result: %s", results)
                 
             else:
                 # Simplistic Logic: If price moves out of range, cancel all and reset?
@@ -680,17 +1298,39 @@ class HyperGridBot:
                 pass
                 
         except Exception as e:
-            logging.error(f"Grid management error: {e}")
+            logging.error("Grid management error: %s", e)
 
     def shutdown(self, signum, frame):
+        # /quit followed by SIGINT (or a repeated signal) must not run this twice
+        if self._shutting_down:
+            return
+        self._shutting_down = True
+        
         logging.info("Shutdown signal received. Cancelling orders...")
         self.running = False
+        self._tick_event.set()
         try:
             if self.exchange:
-                self.exchange.cancel_all_orders()
+                self.safety.cancel_all_orders()
             logging.info("Orders cancelled. Exiting.")
         except Exception as e:
             logging.error(f"Error during shutdown: {e}")
+        # running is already False, so nothing new is queued; the writer
+        # finishes the pending snapshot and exits
+        self._state_stop.set()
+        self.state_thread.join(self.IO_TIMEOUT)
+        if self.state_thread.is_alive():
+            logging.warning("State writer did not drain before shutdown")
+        # Don't wait on in-flight REST calls; a hung one would block exit
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
+        # The SDK's WebsocketManager thread is non-daemon; sys.exit would wait on it
+        if self.info:
+            try:
+                self.info.disconnect_websocket()
+            except Exception as e:
+                logging.warning("Error closing WebSocket: %s", e)
+        # Drain queued log records before exiting
+        self.log_listener.stop()
         sys.exit(0)
 
 if __name__ == "__main__":
@@ -5,6 +5,7 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 from enum import Enum
+from decimal import Decimal
 
 
 class OrderSide(Enum):
@@ -53,6 +54,11 @@ class AccountBalance:
     unrealized_pnl: float
 
 
+def _step_decimals(step: float) -> int:
+    """Number of decimal places in a tick/lot step (e.g. 0.025 -> 3, 1e-06 -> 6)."""
+    return max(0, -Decimal(str(step)).normalize().as_tuple().exponent)
+
+
 @dataclass
 class MarketInfo:
     """Market metadata for a symbol"""
@@ -61,6 +67,15 @@ class MarketInfo:
     lot_size: float
     min_notional: float
     max_leverage: int
+    price_precision: Optional[int] = None
+    qty_precision: Optional[int] = None
+    
+    def __post_init__(self):
+        # Derived once per symbol so order rounding does no string work
+        if self.price_precision is None:
+            self.price_precision = _step_decimals(self.tick_size)
+        if self.qty_precision is None:
+            self.qty_precision = _step_decimals(self.lot_size)
 
 
 class ExchangeAdapter(ABC):
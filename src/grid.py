@@ -1,16 +1,17 @@
+import sys
 import logging
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Shared by every grid order; the SDK only reads it
+_GTC = {'limit': {'tif': 'Gtc'}}
+
 class GridManager:
     def __init__(self, config, exchange):
-        self.config = config
         self.exchange = exchange
-        self.num_grids = config['grid']['grids']
-        self.spacing = config['grid']['spacing_pct']
-        self.leverage = config['grid']['leverage']
         self.active_orders = []
+        self._order_shells = []  # Order dicts reused by place_initial_orders
         
         # Manual Range Mode
         self.min_price = None
@@ -27,7 +28,16 @@ class GridManager:
         except:
              pass
              
-        # Initialize Valid Grid Size
+        self.update_config(config)
+
+    def update_config(self, config):
+        """(Re)load grid parameters from config and recompute the per-grid size"""
+        self.config = config
+        grid_cfg = config['grid']
+        self.pair = sys.intern(grid_cfg['pair'])
+        self.num_grids = grid_cfg['grids']
+        self.spacing = grid_cfg['spacing_pct']
+        self.leverage = grid_cfg['leverage']
         self.size_per_grid_usd = self._calculate_grid_size()
 
     def _calculate_grid_size(self):
@@ -69,43 +79,33 @@ class GridManager:
         If min_price and max_price are set, use Fixed Range (Arithmetic).
         Else, use Spread-based around current_price.
         """
-        buy_levels = []
-        sell_levels = []
-
         if self.min_price and self.max_price:
             # Fixed Range Arithmetic Grid
             # range = max - min
             # step = range / grids
             step = (self.max_price - self.min_price) / self.num_grids
             
-            # Generate all levels from min to max
-            all_levels = [self.min_price + (step * i) for i in range(self.num_grids + 1)]
+            # Generate all levels from min to max (ascending)
+            all_levels = self.min_price + step * np.arange(self.num_grids + 1)
             
             # Split into buy/sell based on current price
             # Levels below current are Buys, above are Sells
-            buy_levels = [l for l in all_levels if l < current_price]
-            sell_levels = [l for l in all_levels if l > current_price]
+            buy_levels = all_levels[all_levels < current_price]
+            sell_levels = all_levels[all_levels > current_price]
             
         else:
             # Existing Spread Logic
-            half_grids = self.num_grids // 2
-            
-            # Buy levels: Price * (1 - spacing * i)
-            for i in range(1, half_grids + 1):
-                price = current_price * (1 - (self.spacing * i))
-                buy_levels.append(price)
-                
-            # Sell levels: Price * (1 + spacing * i)
-            for i in range(1, half_grids + 1):
-                price = current_price * (1 + (self.spacing * i))
-                sell_levels.append(price)
-            
+            # Buy levels: Price * (1 - spacing * i), Sell levels: Price * (1 + spacing * i)
+            offsets = self.spacing * np.arange(1, self.num_grids // 2 + 1)
+            buy_levels = current_price * (1 - offsets)
+            sell_levels = current_price * (1 + offsets)
             
-        # Round all levels to tick size
-        buy_levels = [self.round_to_tick(p) for p in buy_levels]
-        sell_levels = [self.round_to_tick(p) for p in sell_levels]
+        # Round all levels to tick size (vectorised; same half-even rounding as round())
+        tick = self.tick_size
+        buy_levels = np.round(buy_levels / tick) * tick
+        sell_levels = np.round(sell_levels / tick) * tick
         
-        return sorted(buy_levels), sorted(sell_levels)
+        return np.sort(buy_levels).tolist(), np.sort(sell_levels).tolist()
 
     def calculate_volatility_range(self, current_price, high_24h, low_24h):
         """
@@ -132,49 +132,35 @@ class GridManager:
     def place_initial_orders(self, current_price):
         """
         Place initial batch of orders.
+        The returned dicts are pooled and refilled on the next call, so the
+        caller must submit them before placing another initial batch.
         """
         buy_levels, sell_levels = self.calculate_levels(current_price)
         
-        orders = []
-        
         # Use pre-calculated enforced size
         size_per_grid_usd = self.size_per_grid_usd
         
         logger.info(f"Initializing Grid. Price: {current_price}. Size per grid: ${size_per_grid_usd:.2f}")
 
-        # Place Buys
-        for price in buy_levels:
-            sz_coin = size_per_grid_usd / price
-            # Round using dynamic precision
-            sz_fmt = f"{{:.{self.sz_decimals}f}}"
-            px_fmt = f"{{:.{self.px_decimals}f}}"
-            
-            order = {
-                'coin': self.config['grid']['pair'],
-                'is_buy': True,
-                'sz': float(sz_fmt.format(sz_coin)),
-                'limit_px': float(px_fmt.format(price)),
-                'order_type': {'limit': {'tif': 'Gtc'}},
-                'reduce_only': False
-            }
-            orders.append(order)
-            
-        # Place Sells
-        for price in sell_levels:
-            sz_coin = size_per_grid_usd / price
-            
-            sz_fmt = f"{{:.{self.sz_decimals}f}}"
-            px_fmt = f"{{:.{self.px_decimals}f}}"
-
-            order = {
-                'coin': self.config['grid']['pair'],
-                'is_buy': False,
-                'sz': float(sz_fmt.format(sz_coin)),
-                'limit_px': float(px_fmt.format(price)),
-                'order_type': {'limit': {'tif': 'Gtc'}},
-                'reduce_only': False
-            }
-            orders.append(order)
+        # Grow the shell pool to the batch size; existing shells are refilled in place
+        n = len(buy_levels) + len(sell_levels)
+        shells = self._order_shells
+        while len(shells) < n:
+            shells.append({'coin': '', 'is_buy': False, 'sz': 0.0, 'limit_px': 0.0,
+                           'order_type': _GTC, 'reduce_only': False})
+        
+        # Round using dynamic precision
+        sz_decimals, px_decimals, pair = self.sz_decimals, self.px_decimals, self.pair
+        i = 0
+        for is_buy, levels in ((True, buy_levels), (False, sell_levels)):
+            for price in levels:
+                order = shells[i]
+                order['coin'] = pair
+                order['is_buy'] = is_buy
+                order['sz'] = round(size_per_grid_usd / price, sz_decimals)
+                order['limit_px'] = round(price, px_decimals)
+                i += 1
+        orders = shells[:n]
             
         logger.info(f"Generated {len(orders)} initial orders.")
         
@@ -196,13 +182,9 @@ class GridManager:
         # Determine Counter Side
         is_counter_buy = not is_buy_fill
         
-        # Calculate Counter Price
-        if is_buy_fill:
-             # Filled Buy -> Place Sell higher
-             new_price = fill_price * (1 + self.spacing)
-        else:
-             # Filled Sell -> Place Buy lower
-             new_price = fill_price * (1 - self.spacing)
+        # Calculate Counter Price: filled Buy -> Sell higher, filled Sell -> Buy lower
+        sign = 1 if is_buy_fill else -1
+        new_price = fill_price * (1 + sign * self.spacing)
              
         new_price = self.round_to_tick(new_price)
         
@@ -217,7 +199,7 @@ class GridManager:
         px_fmt = f"{{:.{self.px_decimals}f}}"
         
         counter_order = {
-            'coin': self.config['grid']['pair'],
+            'coin': self.pair,
             'is_buy': is_counter_buy,
             'sz': float(sz_fmt.format(new_sz_coin)),
             'limit_px': float(px_fmt.format(new_price)),
@@ -225,6 +207,7 @@ class GridManager:
             'reduce_only': False
         }
         
-        logger.info(f"Generated Counter-Order: {'BUY' if is_counter_buy else 'SELL'} {counter_order['sz']} @ ${counter_order['limit_px']} (Flip from ${fill_price})")
+        logger.info("Generated Counter-Order: %s %s @ $%s (Flip from $%s)",
+                    'BUY' if is_counter_buy else 'SELL', counter_order['sz'], counter_order['limit_px'], fill_price)
         return counter_order
 
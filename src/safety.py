@@ -12,31 +12,36 @@ class SafetyMonitor:
         self.exchange = exchange
         self.info = info
         self.user_address = user_address
-        
-        # Safety Thresholds
-        self.max_drawdown_pct = config['safety']['max_drawdown_pct']
-        self.daily_loss_limit = config['safety']['daily_loss_limit_usd']
-        self.min_margin_ratio = config['safety']['min_margin_ratio']
-        self.max_funding = config['safety']['max_adverse_funding_rate']
+        self.update_config(config)
         
         # State tracking
         self.initial_account_value = None
         self.start_of_day_value = None
         self.current_day = datetime.utcnow().date()
+        self._next_day_epoch = 0  # Epoch seconds of the next UTC midnight
         self.emergency_triggered = False
 
+    def update_config(self, config):
+        """(Re)load safety thresholds from config"""
+        self.config = config
+        self.max_drawdown_pct = config['safety']['max_drawdown_pct']
+        self.daily_loss_limit = config['safety']['daily_loss_limit_usd']
+        self.min_margin_ratio = config['safety']['min_margin_ratio']
+        self.max_funding = config['safety']['max_adverse_funding_rate']
+
     def sync_state(self, account_value):
         """Update internal state with latest account value"""
-        current_date = datetime.utcnow().date()
+        now = time.time()
         
         if self.initial_account_value is None:
             self.initial_account_value = account_value
             logger.info(f"Initialized Safety Monitor. Start Value: ${self.initial_account_value:.2f}")
 
-        # Reset daily PnL tracker on new day
-        if self.start_of_day_value is None or current_date != self.current_day:
+        # Reset daily PnL tracker on new day (float compare until midnight passes)
+        if self.start_of_day_value is None or now >= self._next_day_epoch:
             self.start_of_day_value = account_value
-            self.current_day = current_date
+            self.current_day = datetime.utcfromtimestamp(now).date()
+            self._next_day_epoch = (int(now) // 86400 + 1) * 86400
             logger.info(f"New day started ({self.current_day}). Resetting Daily Loss tracker. Start Value: ${self.start_of_day_value:.2f}")
 
     def check_health(self, account_state):
@@ -144,13 +149,29 @@ class SafetyMonitor:
             
         return True
 
+    def cancel_all_orders(self):
+        """
+        Cancel every open order in one signed bulk_cancel action.
+        Returns the number of orders cancelled.
+        """
+        if not hasattr(self.exchange, 'bulk_cancel'):
+            # MockExchange / adapters exposing their own cancel-all
+            self.exchange.cancel_all_orders()
+            return 0
+        
+        open_orders = self.info.open_orders(self.user_address)
+        if not open_orders:
+            return 0
+        self.exchange.bulk_cancel([{'coin': o['coin'], 'oid': o['oid']} for o in open_orders])
+        return len(open_orders)
+
     def emergency_exit(self):
         """
         Close all positions and cancel all orders.
         """
         try:
             logger.warning("EMERGENCY EXIT INITIALIZED: Cancelling all orders...")
-            self.exchange.cancel_all_orders()
+            self.cancel_all_orders()
             time.sleep(1)
             
             logger.warning("Closing all positions...")
@@ -0,0 +1,104 @@
+import numpy as np
+
+
+class TradeHistory:
+    """
+    Fill log stored column-wise (struct of arrays).
+    Rows are appended in time order; expire() drops the oldest by moving a
+    head index, and the live window is compacted/grown only when full.
+    At most max_rows are kept; beyond that the oldest row is dropped.
+
+    Aggregates over the live window (wins, size/win/loss sums, largest
+    win/loss) are kept up to date on append and drop, so reading them is O(1).
+    """
+    def __init__(self, capacity=1024, max_rows=50000):
+        self.max_rows = max_rows
+        self.ts = np.empty(capacity, dtype='f8')
+        self.price = np.empty(capacity, dtype='f8')
+        self.size = np.empty(capacity, dtype='f8')
+        self.pnl = np.empty(capacity, dtype='f8')
+        self.is_buy = np.empty(capacity, dtype='?')
+        self.head = 0
+        self.n = 0
+        self._reset_stats()
+
+    def __len__(self):
+        return self.n - self.head
+
+    def _reset_stats(self):
+        self.wins = 0
+        self.sum_size = 0.0
+        self.sum_win = 0.0
+        self.sum_loss = 0.0      # Positive magnitude of losing PnL
+        self.largest_win = 0.0   # max(0, max pnl)
+        self.largest_loss = 0.0  # min(0, min pnl)
+
+    def _make_room(self):
+        live = self.n - self.head
+        capacity = len(self.ts)
+        # Grow only if the live window fills more than half the buffer
+        new_capacity = capacity * 2 if live * 2 > capacity else capacity
+        for name in ('ts', 'price', 'size', 'pnl', 'is_buy'):
+            old = getattr(self, name)
+            new = old if new_capacity == capacity else np.empty(new_capacity, dtype=old.dtype)
+            new[:live] = old[self.head:self.n]
+            setattr(self, name, new)
+        self.head = 0
+        self.n = live
+
+    def _drop(self, count):
+        """Remove the oldest count rows and take them out of the aggregates"""
+        start, stop = self.head, self.head + count
+        self.head = stop
+        if self.head == self.n:
+            self._reset_stats()
+            return
+
+        pnl = self.pnl[start:stop]
+        won = pnl[pnl > 0]
+        won_sum = float(won.sum())
+        self.wins -= len(won)
+        self.sum_size -= float(self.size[start:stop].sum())
+        self.sum_win -= won_sum
+        # sum(pnl) = won - lost, so the losses fall out without a second mask
+        self.sum_loss -= won_sum - float(pnl.sum())
+        # Repeated add/subtract leaves float residue once a side empties out;
+        # snap it to 0 so profit_factor sees the no-losses case
+        if not self.wins:
+            self.sum_win = 0.0
+        if abs(self.sum_loss) < 1e-9:
+            self.sum_loss = 0.0
+        # Extremes only need a rescan if one of them just left the window
+        live = self.pnl[self.head:self.n]
+        if self.largest_win > 0 and len(won) and won.max() >= self.largest_win:
+            self.largest_win = max(float(live.max()), 0.0)
+        if self.largest_loss < 0 and pnl.min() <= self.largest_loss:
+            self.largest_loss = min(float(live.min()), 0.0)
+
+    def append(self, ts, price, size, is_buy, pnl=0.0):
+        if self.n - self.head >= self.max_rows:
+            self._drop(1)
+        if self.n == len(self.ts):
+            self._make_room()
+        i = self.n
+        self.ts[i] = ts
+        self.price[i] = price
+        self.size[i] = size
+        self.pnl[i] = pnl
+        self.is_buy[i] = is_buy
+        self.n = i + 1
+
+        self.sum_size += size
+        if pnl > 0:
+            self.wins += 1
+            self.sum_win += pnl
+            self.largest_win = max(self.largest_win, pnl)
+        elif pnl < 0:
+            self.sum_loss -= pnl
+            self.largest_loss = min(self.largest_loss, pnl)
+
+    def expire(self, cutoff):
+        """Drop rows with ts < cutoff"""
+        count = int(np.searchsorted(self.ts[self.head:self.n], cutoff, side='left'))
+        if count:
+            self._drop(count)